@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Calibration benchmark of the bcrypt work factor: times one hash at each
+cost on this host, then picks the highest cost hashing within the
+target, as calibrate_rounds does, and the hashes per second of a
+PasswordHasher at that cost.
+
+    ./bench_bcrypt_rounds.py [target ms] [max rounds]
+"""
+import statistics
+import sys
+import time
+
+from encrypt_password import PasswordHasher, calibrate_rounds, time_rounds
+
+
+def main() -> None:
+    """Prints the time per cost and the chosen factor."""
+    target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    max_rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    print("{:>6} {:>12}".format("rounds", "ms/hash"))
+    for rounds in range(4, max_rounds + 1):
+        elapsed = statistics.median(time_rounds(rounds) for _ in range(3))
+        print("{:>6} {:>12.1f}".format(rounds, elapsed))
+        # Each cost doubles the time: stop well past the target
+        if elapsed > 4 * target_ms:
+            break
+
+    rounds = calibrate_rounds(target_ms, max_rounds=max_rounds)
+    print("chosen for {:.0f}ms: BCRYPT_ROUNDS={}".format(target_ms, rounds))
+
+    hasher = PasswordHasher(rounds)
+    count = 4 * hasher.max_workers
+    start = time.perf_counter()
+    for _ in hasher.iter_hashes("password{}".format(i)
+                                for i in range(count)):
+        pass
+    elapsed = time.perf_counter() - start
+    hasher.close()
+    print("{} workers: {:.1f} hashes/s".format(hasher.max_workers,
+                                               count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,97 @@
 #!/usr/bin/env python3
 """Module for securely hashing and verifying passwords."""
 
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator, List
+
 import bcrypt
 
 
+def _default_rounds() -> int:
+    """Returns the bcrypt work factor set by BCRYPT_ROUNDS (default 12)."""
+    return int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+
 def hash_password(password: str) -> bytes:
     """Generates a hashed password with salt."""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(_default_rounds()))
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
     """Checks if a given password matches the hashed password."""
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+class PasswordHasher:
+    """
+    Hashing service running bcrypt in a bounded thread pool, so callers
+    don't block on it (bcrypt releases the GIL while hashing).
+    """
+
+    def __init__(self, rounds: int = None, max_workers: int = None):
+        self.rounds = rounds if rounds is not None else _default_rounds()
+        if max_workers is None:
+            max_workers = int(os.environ.get("BCRYPT_WORKERS",
+                                             os.cpu_count() or 1))
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers,
+                                            thread_name_prefix="bcrypt")
+
+    def hash_password(self, password: str) -> bytes:
+        """Hashes a password with the configured work factor."""
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds))
+
+    def submit_hash(self, password: str) -> Future:
+        """Hashes a password in the pool."""
+        return self._executor.submit(self.hash_password, password)
+
+    def submit_is_valid(self, hashed_password: bytes,
+                        password: str) -> Future:
+        """Checks a password against its hash in the pool."""
+        return self._executor.submit(is_valid, hashed_password, password)
+
+    def iter_hashes(self, passwords: Iterable[str],
+                    window: int = None) -> Iterator[bytes]:
+        """
+        Hashes passwords in parallel, yielding the hashes in order. At
+        most `window` hashes (twice the workers by default) are pending
+        at once, so a bulk import doesn't queue every password.
+        """
+        if window is None:
+            window = 2 * self.max_workers
+        pending = deque()
+        for password in passwords:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(self.submit_hash(password))
+        while pending:
+            yield pending.popleft().result()
+
+    def hash_many(self, passwords: Iterable[str]) -> List[bytes]:
+        """Hashes passwords in parallel, keeping their order."""
+        return list(self.iter_hashes(passwords))
+
+    def close(self) -> None:
+        """Waits for pending hashes and stops the pool."""
+        self._executor.shutdown(wait=True)
+
+
+def calibrate_rounds(target_ms: float = 250.0, min_rounds: int = 4,
+                     max_rounds: int = 16) -> int:
+    """Returns the highest work factor hashing within `target_ms` here."""
+    rounds = min_rounds
+    while rounds < max_rounds:
+        if time_rounds(rounds + 1) > target_ms:
+            break
+        rounds += 1
+    return rounds
+
+
+def time_rounds(rounds: int) -> float:
+    """Returns the milliseconds one hash takes here at a work factor."""
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+    return (time.perf_counter() - start) * 1000
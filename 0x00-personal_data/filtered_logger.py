@@ -2,21 +2,58 @@
 """Module for managing and logging sensitive personal data with redaction."""
 
 import re
+import sys
+import time
+import queue
 import logging
+import sqlite3
+import threading
 import mysql.connector
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from os import environ
-from typing import List
+from typing import Iterator, List, Sequence, Tuple
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
+class RedactionEngine:
+    """Replaces the values of sensitive fields, compiled once."""
+
+    def __init__(self, fields: List[str], redaction: str, separator: str):
+        self.fields = tuple(fields)
+        self._keys = tuple(f"{field}=" for field in self.fields)
+        alternation = '|'.join(re.escape(field) for field in self.fields)
+        self._pattern = re.compile(
+            f"({alternation})=.*?{re.escape(separator)}")
+        suffix = f"={redaction}{separator}"
+        self._replace = lambda match: match[1] + suffix
+
+    def redact(self, message: str) -> str:
+        """Redacts a message, skipping the regex when no field is present."""
+        for key in self._keys:
+            if key in message:
+                return self._pattern.sub(self._replace, message)
+        if not self._keys:
+            return self._pattern.sub(self._replace, message)
+        return message
+
+
+@lru_cache(maxsize=32)
+def _redaction_engine(fields: Tuple[str, ...], redaction: str,
+                      separator: str) -> RedactionEngine:
+    """Returns the engine for a set of fields, compiling it on first use."""
+    return RedactionEngine(fields, redaction, separator)
+
+
 def filter_datum(fields: List[str],
                  redaction: str, message: str, separator: str) -> str:
     """Replaces sensitive data fields in a log."""
-    pattern = f"({'|'.join(fields)})=.*?{separator}"
-    return re.sub(pattern,
-                  lambda x: f"{x.group(1)}={redaction}{separator}", message)
+    engine = _redaction_engine(tuple(fields), redaction, separator)
+    return engine.redact(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -31,22 +68,135 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.engine = RedactionEngine(fields, self.REDACTION, self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """Filters values of fields in values."""
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
+        if not getattr(record, "redacted", False):
+            record.msg = self.engine.redact(record.getMessage())
         return super(RedactingFormatter, self).format(record)
 
 
+class AsyncRedactingHandler(logging.Handler):
+    """
+    Non-blocking handler: callers only enqueue records, a background worker
+    redacts, formats and writes them to the stream in batches.
+    """
+
+    def __init__(self, fields: List[str], stream=None, maxsize: int = 10000,
+                 block: bool = False, batch_size: int = 256):
+        super(AsyncRedactingHandler, self).__init__()
+        self.setFormatter(RedactingFormatter(fields=fields))
+        self.stream = stream if stream is not None else sys.stderr
+        self.block = block
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize)
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Enqueues a record, or blocks or drops it if the queue is full."""
+        try:
+            # Merged on the caller's thread, like QueueHandler.prepare:
+            # the arguments may change before the worker formats them
+            record.msg = record.getMessage()
+            record.args = None
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self.queue.put(record, block=self.block)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Waits until every enqueued record is written."""
+        if self._worker.is_alive():
+            self.queue.join()
+
+    def close(self) -> None:
+        """Writes the pending records and stops the worker."""
+        if self._worker.is_alive():
+            self.queue.put(None)
+            self._worker.join()
+        super(AsyncRedactingHandler, self).close()
+
+    def stats(self) -> dict:
+        """Returns throughput and latency counters of the pipeline."""
+        return {
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "queued": self.queue.qsize(),
+            "avg_latency": self.total_latency / max(self.written, 1),
+            "max_latency": self.max_latency,
+        }
+
+    def _run(self) -> None:
+        """Worker loop: drains the queue in batches until closed."""
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            running = len(records) == len(batch)
+            try:
+                self._write(records)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        """Formats a batch of records and writes it at once."""
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + "\n")
+            except Exception:
+                self.handleError(record)
+        if lines:
+            try:
+                self.stream.write("".join(lines))
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[0])
+        now = time.time()
+        for record in records:
+            latency = now - record.created
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        self.written += len(records)
+        self.batches += 1
+
+
 def get_logger() -> logging.Logger:
     """Configures and returns a logger for enabled."""
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
     logger.propagate = False
+    if logger.handlers:
+        return logger
 
-    handler = logging.StreamHandler()
-    handler.setFormatter(RedactingFormatter(fields=PII_FIELDS))
+    if environ.get("PERSONAL_DATA_LOG_ASYNC", "0") == "1":
+        handler = AsyncRedactingHandler(
+            PII_FIELDS,
+            maxsize=int(environ.get("PERSONAL_DATA_LOG_QUEUE_SIZE", 10000)),
+            block=environ.get("PERSONAL_DATA_LOG_POLICY", "drop") == "block")
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(RedactingFormatter(fields=PII_FIELDS))
     logger.addHandler(handler)
 
     return logger
@@ -54,6 +204,11 @@ def get_logger() -> logging.Logger:
 
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """Creates and returns a connection to the personal data MySQL database."""
+    if environ.get("PERSONAL_DATA_DB_DRIVER") == "sqlite":
+        # Local stand-in: PERSONAL_DATA_DB_NAME is the database file
+        return sqlite3.connect(environ.get("PERSONAL_DATA_DB_NAME",
+                                           ":memory:"),
+                               check_same_thread=False)
     return mysql.connector.connect(
         user=environ.get("PERSONAL_DATA_DB_USERNAME", "root"),
         password=environ.get("PERSONAL_DATA_DB_PASSWORD", ""),
@@ -62,20 +217,189 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     )
 
 
-def main():
-    """Connects to the database, retrieves and logs."""
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users;")
-    column_names = [col[0] for col in cursor.description]
-    logger = get_logger()
+class ConnectionPool:
+    """
+    Bounded pool of connections created by get_db, checked for health
+    before reuse.
+    """
+
+    def __init__(self, size: int = 5, timeout: float = 30.0,
+                 connect=get_db):
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
 
-    for row in cursor:
+    @contextmanager
+    def connection(self):
+        """Checks a connection out for the duration of a with block."""
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            self.release(db)
+
+    def acquire(self):
+        """Checks a connection out, waiting up to `timeout` seconds."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No database connection available")
+        try:
+            while True:
+                try:
+                    db = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._healthy(db):
+                    return db
+                self._discard(db)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, db) -> None:
+        """Returns a checked out connection to the pool, rolled back so
+        that the next borrower doesn't inherit an open transaction."""
+        try:
+            db.rollback()
+        except Exception:
+            self._discard(db)
+        else:
+            self._idle.put(db)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Closes the idle connections."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _healthy(db) -> bool:
+        """Pings a connection before handing it out again."""
+        try:
+            if hasattr(db, "is_connected"):
+                return db.is_connected()
+            cursor = db.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(db) -> None:
+        """Closes a connection, ignoring errors of broken ones."""
+        try:
+            db.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> ConnectionPool:
+    """Returns the shared connection pool, sized by the
+    PERSONAL_DATA_DB_POOL_SIZE and PERSONAL_DATA_DB_POOL_TIMEOUT variables."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                size=int(environ.get("PERSONAL_DATA_DB_POOL_SIZE", 5)),
+                timeout=float(environ.get("PERSONAL_DATA_DB_POOL_TIMEOUT",
+                                          30)))
+        return _pool
+
+
+def format_rows(column_names: Sequence[str], rows: List[tuple],
+                redact: bool = False) -> List[str]:
+    """Formats rows as `column=value;` log lines, redacted if asked."""
+    lines = []
+    for row in rows:
         row_data = "; ".join(f"{name}={value}" for name,
                              value in zip(column_names, row))
-        logger.info(row_data + ";")
+        lines.append(row_data + ";")
+    if redact:
+        engine = _redaction_engine(PII_FIELDS, RedactingFormatter.REDACTION,
+                                   RedactingFormatter.SEPARATOR)
+        lines = [engine.redact(line) for line in lines]
+    return lines
 
-    cursor.close()
+
+def stream_rows(db, columns: Sequence[str] = None,
+                batch_size: int = 1000) -> Iterator[Tuple[list, list]]:
+    """Yields (column names, rows) batches of the users table through an
+    unbuffered cursor, so that the client never holds the whole table."""
+    projection = "*"
+    if columns:
+        for column in columns:
+            if not re.fullmatch(r"\w+", column):
+                raise ValueError(f"Invalid column name: {column}")
+        projection = ", ".join(columns)
+    try:
+        cursor = db.cursor(buffered=False)
+    except TypeError:
+        cursor = db.cursor()
+    try:
+        cursor.execute(f"SELECT {projection} FROM users;")
+        column_names = [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield column_names, rows
+    finally:
+        cursor.close()
+
+
+def export_users(db, logger: logging.Logger, batch_size: int = 1000,
+                 columns: Sequence[str] = None, workers: int = 0) -> int:
+    """Logs every row of the users table in batches, redacting them in
+    `workers` processes when set. Returns the number of rows logged."""
+    count = 0
+    batches = stream_rows(db, columns, batch_size)
+    if workers <= 0:
+        for column_names, rows in batches:
+            for line in format_rows(column_names, rows):
+                logger.info(line)
+            count += len(rows)
+        return count
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for column_names, rows in batches:
+            pending.append(executor.submit(format_rows, column_names,
+                                           rows, True))
+            # Bound the batches held in memory while workers catch up
+            if len(pending) >= 2 * workers:
+                count += _log_redacted(logger, pending.popleft().result())
+        while pending:
+            count += _log_redacted(logger, pending.popleft().result())
+    return count
+
+
+def _log_redacted(logger: logging.Logger, lines: List[str]) -> int:
+    """Logs lines already redacted by a worker."""
+    for line in lines:
+        logger.info(line, extra={"redacted": True})
+    return len(lines)
+
+
+def main():
+    """Connects to the database, retrieves and logs."""
+    columns = environ.get("PERSONAL_DATA_EXPORT_COLUMNS")
+    db = get_db()
+    export_users(
+        db, get_logger(),
+        batch_size=int(environ.get("PERSONAL_DATA_EXPORT_BATCH_SIZE", 1000)),
+        columns=columns.split(",") if columns else None,
+        workers=int(environ.get("PERSONAL_DATA_EXPORT_WORKERS", 0)))
     db.close()
 
 
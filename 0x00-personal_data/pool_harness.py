@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Harness of ConnectionPool against the SQLite stand-in driver
+(PERSONAL_DATA_DB_DRIVER=sqlite): checkout bound, timeout, replacement
+of broken connections, rollback on release, and checkout cost.
+
+    ./pool_harness.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["PERSONAL_DATA_DB_DRIVER"] = "sqlite"
+os.environ.setdefault("PERSONAL_DATA_DB_NAME",
+                      os.path.join(tempfile.mkdtemp(), "holberton.db"))
+
+from filtered_logger import ConnectionPool, get_db  # noqa: E402
+
+
+failures = []
+
+
+def check(name: str, condition: bool) -> None:
+    """Prints and records the outcome of a check."""
+    print("{:<48} {}".format(name, "ok" if condition else "FAILED"))
+    if not condition:
+        failures.append(name)
+
+
+def counting_connect(opened: list):
+    """Returns a get_db wrapper counting the connections it opens."""
+    def connect():
+        opened.append(1)
+        return get_db()
+    return connect
+
+
+def create_users() -> None:
+    """Creates the users table of the stand-in database."""
+    db = get_db()
+    db.execute("DROP TABLE IF EXISTS users")
+    db.execute("CREATE TABLE users (name TEXT, email TEXT)")
+    db.execute("INSERT INTO users VALUES ('bob', 'bob@dylan.com')")
+    db.commit()
+    db.close()
+
+
+def check_bound() -> None:
+    """8 threads share 2 connections, never holding more at once."""
+    opened = []
+    pool = ConnectionPool(size=2, timeout=5, connect=counting_connect(opened))
+    lock = threading.Lock()
+    state = {"out": 0, "max": 0}
+
+    def worker():
+        for _ in range(50):
+            with pool.connection() as db:
+                with lock:
+                    state["out"] += 1
+                    state["max"] = max(state["max"], state["out"])
+                db.execute("SELECT COUNT(*) FROM users").fetchall()
+                with lock:
+                    state["out"] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    check("at most 2 connections checked out", state["max"] <= 2)
+    check("at most 2 connections opened", len(opened) <= 2)
+
+
+def check_timeout() -> None:
+    """A checkout waits `timeout` seconds, then raises TimeoutError."""
+    pool = ConnectionPool(size=1, timeout=0.1)
+    db = pool.acquire()
+    start = time.perf_counter()
+    try:
+        pool.acquire()
+        raised = False
+    except TimeoutError:
+        raised = True
+    waited = time.perf_counter() - start
+    pool.release(db)
+    check("exhausted pool raises TimeoutError", raised)
+    check("after waiting the timeout", 0.1 <= waited < 1)
+    pool.close()
+
+
+def check_broken() -> None:
+    """Connections closed while idle or checked out are replaced."""
+    pool = ConnectionPool(size=1, timeout=1)
+    db = pool.acquire()
+    pool.release(db)
+    db.close()
+    replacement = pool.acquire()
+    check("idle closed connection replaced", replacement is not db)
+    replacement.close()
+    pool.release(replacement)
+    db = pool.acquire()
+    check("released closed connection discarded", db is not replacement)
+    check("replacement works",
+          db.execute("SELECT 1").fetchall() == [(1,)])
+    pool.release(db)
+    pool.close()
+
+
+def check_rollback() -> None:
+    """A transaction left open by a borrower isn't handed to the next."""
+    pool = ConnectionPool(size=1, timeout=1)
+    with pool.connection() as db:
+        db.execute("INSERT INTO users VALUES ('eve', 'eve@x.com')")
+    with pool.connection() as db:
+        reused = not db.in_transaction
+        count = db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    check("released connection rolled back", reused)
+    check("uncommitted insert discarded", count == 1)
+    pool.close()
+
+
+def measure(count: int = 10000) -> None:
+    """Compares a pooled checkout to a new connection per query."""
+    pool = ConnectionPool(size=1)
+    start = time.perf_counter()
+    for _ in range(count):
+        with pool.connection() as db:
+            db.execute("SELECT 1").fetchall()
+    pooled = (time.perf_counter() - start) / count
+    pool.close()
+    start = time.perf_counter()
+    for _ in range(count):
+        db = get_db()
+        db.execute("SELECT 1").fetchall()
+        db.close()
+    direct = (time.perf_counter() - start) / count
+    print("pooled checkout + SELECT 1: {:.1f}us, new connection: {:.1f}us"
+          .format(pooled * 1e6, direct * 1e6))
+
+
+if __name__ == "__main__":
+    create_users()
+    check_bound()
+    check_timeout()
+    check_broken()
+    check_rollback()
+    measure()
+    sys.exit(1 if failures else 0)
@@ -18,6 +18,14 @@ CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 auth = None
 AUTH_TYPE = os.getenv("AUTH_TYPE")
 
+# Paths reachable without authentication
+EXCLUDED_PATHS = (
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/'
+)
+
 
 # Select authentication type based on environment variable
 if AUTH_TYPE == "auth":
@@ -68,19 +76,12 @@ def before_request() -> None:
     and manages access control for protected routes.
     """
     if auth:
-        setattr(request, "current_user", auth.current_user(request))
-        excluded_paths = [
-            '/api/v1/status/',
-            '/api/v1/unauthorized/',
-            '/api/v1/forbidden/',
-            '/api/v1/auth_session/login/'
-        ]
-
-        if auth.require_auth(request.path, excluded_paths):
+        current_user = auth.cached_current_user(request)
+        if auth.require_auth(request.path, EXCLUDED_PATHS):
             cookie = auth.session_cookie(request)
             if auth.authorization_header(request) is None and cookie is None:
                 abort(401, description="Unauthorized")
-            if auth.current_user(request) is None:
+            if current_user is None:
                 abort(403, description="Forbidden")
 
 
@@ -7,9 +7,66 @@ from flask import request
 from typing import List, TypeVar
 
 
+class PathMatcher:
+    """Prefix trie of the paths excluded from authentication."""
+
+    def __init__(self, excluded_paths: List[str]):
+        """
+        Compiles excluded path rules. A path matches a rule when one is a
+        prefix of the other (which makes trailing slashes optional), or
+        when the rule ends with `*` and the path starts with what precedes.
+
+        Args:
+            excluded_paths (List[str]): The rules to compile.
+        """
+        self._root = {}
+        for rule in excluded_paths:
+            self._insert(rule)
+            if rule.endswith("*"):
+                self._insert(rule[:-1])
+
+    def _insert(self, rule: str) -> None:
+        """
+        Adds a rule to the trie; the None key marks the end of a rule.
+        """
+        node = self._root
+        for char in rule:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def matches(self, path: str) -> bool:
+        """
+        Checks a path against the rules in O(len(path)).
+
+        Args:
+            path (str): The URL path to check.
+
+        Returns:
+            bool: True if the path matches an excluded path rule.
+        """
+        node = self._root
+        if not node:
+            return False
+        for char in path:
+            if None in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return True
+
+
 class Auth:
     """Handles API authentication mechanisms and utilities."""
 
+    # Number of current user resolutions done through cached_current_user
+    auth_resolutions = 0
+
+    # Last compiled excluded paths
+    _matcher = None
+    _matcher_rules = None
+    _matcher_source = None
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Checks if a given path requires authentication.
@@ -25,14 +82,22 @@ class Auth:
             return True
         if excluded_paths is None or not excluded_paths:
             return True
-        if path in excluded_paths:
-            return False
-        for i in excluded_paths:
-            if i.endswith("*") and path.startswith(i[:-1]):
-                return False
-            if i.startswith(path) or path.startswith(i):
-                return False
-        return True
+        return not self._path_matcher(excluded_paths).matches(path)
+
+    def _path_matcher(self, excluded_paths: List[str]) -> 'PathMatcher':
+        """
+        Returns the PathMatcher of excluded paths, compiled once per
+        distinct list of rules.
+        """
+        if excluded_paths is not self._matcher_source:
+            rules = tuple(excluded_paths)
+            if rules != self._matcher_rules:
+                self._matcher = PathMatcher(rules)
+                self._matcher_rules = rules
+            # Tuples can't change, so they are recognized by identity
+            if isinstance(excluded_paths, tuple):
+                self._matcher_source = excluded_paths
+        return self._matcher
 
     def authorization_header(self, request=None) -> str:
         """
@@ -60,6 +125,25 @@ class Auth:
         """
         return None
 
+    def cached_current_user(self, request=None) -> TypeVar('User'):
+        """
+        Retrieves the current user once per request and memoizes it on
+        the request as `current_user`.
+
+        Args:
+            request: The request object containing user data.
+
+        Returns:
+            User: The current user instance, or None.
+        """
+        if request is None:
+            return None
+        if getattr(request, "auth_resolutions", 0) == 0:
+            request.current_user = self.current_user(request)
+            request.auth_resolutions = 1
+            self.auth_resolutions += 1
+        return request.current_user
+
     def session_cookie(self, request=None):
         """
         Retrieves the session cookie from a request.
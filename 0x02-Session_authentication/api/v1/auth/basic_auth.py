@@ -3,6 +3,12 @@
 Definition of class BasicAuth
 """
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 from .auth import Auth
 from typing import TypeVar
 
@@ -12,6 +18,25 @@ from models.user import User
 class BasicAuth(Auth):
     """ Implement Basic Authorization protocol methods
     """
+    def __init__(self):
+        """
+        Configures the verified-credential cache from BASIC_AUTH_CACHE_SIZE
+        (0 disables it) and BASIC_AUTH_CACHE_TTL (seconds)
+        """
+        try:
+            self.cache_size = int(os.getenv("BASIC_AUTH_CACHE_SIZE", 0))
+        except ValueError:
+            self.cache_size = 0
+        try:
+            self.cache_ttl = float(os.getenv("BASIC_AUTH_CACHE_TTL", 300))
+        except ValueError:
+            self.cache_ttl = 300
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_secret = os.urandom(32)
+
     def extract_base64_authorization_header(self,
                                             authorization_header: str) -> str:
         """
@@ -86,11 +111,64 @@ class BasicAuth(Auth):
         """
         Auth_header = self.authorization_header(request)
         if Auth_header is not None:
+            cache_key = self._cache_key(Auth_header)
+            if cache_key is not None:
+                user = self._cached_user(cache_key)
+                if user is not None:
+                    return user
             token = self.extract_base64_authorization_header(Auth_header)
             if token is not None:
                 decoded = self.decode_base64_authorization_header(token)
                 if decoded is not None:
                     email, pword = self.extract_user_credentials(decoded)
                     if email is not None:
-                        return self.user_object_from_credentials(email, pword)
+                        user = self.user_object_from_credentials(email, pword)
+                        if user is not None and cache_key is not None:
+                            self._cache_user(cache_key, user, email)
+                        return user
         return
+
+    def _cache_key(self, authorization_header: str) -> bytes:
+        """
+        Keyed hash of an Authorization header, None if caching is disabled
+        """
+        if self.cache_size <= 0 or not isinstance(authorization_header, str):
+            return None
+        return hmac.new(self._cache_secret, authorization_header.encode(),
+                        hashlib.sha256).digest()
+
+    def _cached_user(self, cache_key: bytes) -> TypeVar('User'):
+        """
+        Returns the User verified for a cache key, dropping the entry if
+        it expired or if the user was removed or changed email or password
+        since
+        """
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                self.cache_misses += 1
+                return None
+            user_id, email, password, expires_at = entry
+            user = User.get(user_id)
+            if time.monotonic() > expires_at or user is None \
+                    or user.email != email or user.password != password:
+                del self._cache[cache_key]
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(cache_key)
+            self.cache_hits += 1
+            return user
+
+    def _cache_user(self, cache_key: bytes, user: TypeVar('User'),
+                    email: str):
+        """
+        Remembers the User verified for a cache key with the email it was
+        found by, evicting the least recently used entries beyond the
+        cache size
+        """
+        with self._cache_lock:
+            self._cache[cache_key] = (user.id, email, user.password,
+                                      time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -6,13 +6,15 @@ import base64
 from uuid import uuid4
 from typing import TypeVar
 from .auth import Auth
+from .session_store import session_store_from_env
 from models.user import User
 
 
 class SessionAuth(Auth):
     """Handles session-based authentication methods."""
 
-    user_id_by_session_id = {}
+    # Shared by the worker processes when SESSION_STORE=sqlite
+    user_id_by_session_id = session_store_from_env()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -73,7 +75,6 @@ class SessionAuth(Auth):
         session_cookie = self.session_cookie(request)
         if session_cookie is None:
             return False
-        if session_cookie not in self.user_id_by_session_id:
-            return False
-        del self.user_id_by_session_id[session_cookie]
-        return True
+        # A single removal, another worker may destroy it concurrently
+        return self.user_id_by_session_id.pop(session_cookie, None) \
+            is not None
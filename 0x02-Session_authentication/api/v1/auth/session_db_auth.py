@@ -3,7 +3,9 @@
 Defines the SessionDBAuth class that manages sessions with persistent storage
 in a database.
 """
+from datetime import datetime, timedelta
 from .session_exp_auth import SessionExpAuth
+from models.base import EPOCH
 from models.user_session import UserSession
 
 
@@ -11,8 +13,27 @@ class SessionDBAuth(SessionExpAuth):
     """
     Implements session authentication with persistence by storing session data
     in a database.
+
+    With a shared session store (SESSION_STORE=sqlite), the store is that
+    database: UserSession objects live in the memory of one worker and each
+    worker rewrites their file, so they would hide the sessions created or
+    destroyed by the other workers, and aren't used.
     """
 
+    def __init__(self):
+        """
+        Loads the stored sessions and schedules their expiration.
+        """
+        super().__init__()
+        self.shared = getattr(self.user_id_by_session_id, "shared", False)
+        if self.shared:
+            # Expired sessions are purged from the store by reap()
+            return
+        UserSession.load_from_file()
+        for user_session in UserSession.iter_all():
+            created_at = (user_session.created_at - EPOCH).total_seconds()
+            self.schedule_expiry(user_session.session_id, created_at)
+
     def create_session(self, user_id=None):
         """
         Creates a Session ID for a given user_id and stores it in the database.
@@ -24,8 +45,8 @@ class SessionDBAuth(SessionExpAuth):
             str: Session ID if successful, None otherwise
         """
         session_id = super().create_session(user_id)
-        if not session_id:
-            return None
+        if not session_id or self.shared:
+            return session_id
         kw = {
             "user_id": user_id,
             "session_id": session_id
@@ -44,10 +65,53 @@ class SessionDBAuth(SessionExpAuth):
         Returns:
             str: User ID associated with the session ID, or None if not found
         """
-        user_id = UserSession.search({"session_id": session_id})
-        if user_id:
-            return user_id[0].user_id
-        return None
+        if self.shared:
+            return super().user_id_for_session_id(session_id)
+        user_sessions = UserSession.search({"session_id": session_id})
+        if not user_sessions:
+            return None
+        user_session = user_sessions[0]
+        if self.session_duration > 0:
+            expiration_time = user_session.created_at + \
+                timedelta(seconds=self.session_duration)
+            if datetime.utcnow() > expiration_time:
+                self.evict_session(session_id)
+                return None
+        return user_session.user_id
+
+    def evict_session(self, session_id):
+        """
+        Removes an expired session from memory and from the database.
+
+        Args:
+            session_id (str): The session ID
+
+        Returns:
+            bool: True if a session was removed.
+        """
+        evicted = super().evict_session(session_id)
+        if self.shared:
+            return evicted
+        user_sessions = UserSession.search({"session_id": session_id})
+        for user_session in user_sessions:
+            user_session.remove()
+        if user_sessions and not evicted:
+            self.evicted_count += 1
+        return evicted or len(user_sessions) > 0
+
+    def reaper_stats(self):
+        """
+        Reports the state of the session reaper, including stored sessions.
+
+        Returns:
+            dict: Reaper statistics.
+        """
+        stats = super().reaper_stats()
+        if self.shared:
+            stats["stored_sessions"] = stats["sessions"]
+        else:
+            stats["stored_sessions"] = UserSession.count()
+        return stats
 
     def destroy_session(self, request=None):
         """
@@ -64,6 +128,10 @@ class SessionDBAuth(SessionExpAuth):
         session_id = self.session_cookie(request)
         if not session_id:
             return False
+        if self.shared:
+            return self.user_id_by_session_id.pop(session_id, None) \
+                is not None
+        self.user_id_by_session_id.pop(session_id, None)
         user_session = UserSession.search({"session_id": session_id})
         if user_session:
             user_session[0].remove()  # Remove the session from the database
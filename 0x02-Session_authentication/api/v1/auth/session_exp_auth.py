@@ -2,7 +2,10 @@
 """
 SessionExpAuth class for session handling with expiration.
 """
+import heapq
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 from .session_auth import SessionAuth
 
@@ -12,14 +15,29 @@ class SessionExpAuth(SessionAuth):
     Manages sessions with an expiration time.
     """
 
+    # Maximum number of sessions evicted by an incremental reap
+    reap_batch = 100
+
     def __init__(self):
         """
-        Sets the session duration from environment variables, defaulting to 0.
+        Sets the session duration from environment variables, defaulting to 0,
+        and starts the background reaper when SESSION_REAPER_INTERVAL is set.
         """
         try:
             self.session_duration = int(os.getenv('SESSION_DURATION', 0))
         except ValueError:
             self.session_duration = 0
+        self._expiries = []
+        self._reaper_lock = threading.Lock()
+        self.evicted_count = 0
+        try:
+            interval = float(os.getenv('SESSION_REAPER_INTERVAL', 0))
+        except ValueError:
+            interval = 0
+        if interval > 0 and self.session_duration > 0:
+            reaper = threading.Thread(target=self._reaper_loop,
+                                      args=(interval,), daemon=True)
+            reaper.start()
 
     def create_session(self, user_id=None):
         """
@@ -39,6 +57,8 @@ class SessionExpAuth(SessionAuth):
             "user_id": user_id,
             "created_at": datetime.now()
         }
+        self.schedule_expiry(session_id, time.time())
+        self.reap(limit=self.reap_batch)
         return session_id
 
     def user_id_for_session_id(self, session_id=None):
@@ -65,6 +85,86 @@ class SessionExpAuth(SessionAuth):
         created_at = user_details["created_at"]
         expiration_time = created_at + timedelta(seconds=self.session_duration)
         if datetime.now() > expiration_time:
+            self.evict_session(session_id)
             return None
 
         return user_details.get("user_id")
+
+    def schedule_expiry(self, session_id: str, created_at: float) -> None:
+        """
+        Registers the expiration of a session in the TTL heap.
+
+        Args:
+            session_id (str): The session ID
+            created_at (float): Creation time of the session (epoch seconds)
+        """
+        if self.session_duration <= 0:
+            return
+        with self._reaper_lock:
+            heapq.heappush(self._expiries,
+                           (created_at + self.session_duration, session_id))
+
+    def reap(self, now: float = None, limit: int = None) -> int:
+        """
+        Evicts the sessions whose expiration time has passed.
+
+        Args:
+            now (float): Current time (epoch seconds), defaults to time.time()
+            limit (int): Maximum number of sessions to evict, unlimited if None
+
+        Returns:
+            int: The number of sessions evicted.
+        """
+        if now is None:
+            now = time.time()
+        evicted = 0
+        while limit is None or evicted < limit:
+            with self._reaper_lock:
+                if not self._expiries or self._expiries[0][0] > now:
+                    break
+                session_id = heapq.heappop(self._expiries)[1]
+            if self.evict_session(session_id):
+                evicted += 1
+        # Sessions of a shared store may have been created by workers
+        # that stopped before reaping them
+        purge = getattr(self.user_id_by_session_id,
+                        "purge_created_before", None)
+        if limit is None and purge is not None and self.session_duration > 0:
+            evicted += purge(now - self.session_duration)
+        return evicted
+
+    def evict_session(self, session_id: str) -> bool:
+        """
+        Removes an expired session.
+
+        Args:
+            session_id (str): The session ID
+
+        Returns:
+            bool: True if a session was removed.
+        """
+        if self.user_id_by_session_id.pop(session_id, None) is None:
+            return False
+        self.evicted_count += 1
+        return True
+
+    def reaper_stats(self) -> dict:
+        """
+        Reports the state of the session reaper.
+
+        Returns:
+            dict: Evicted sessions count, live sessions and pending expiries.
+        """
+        return {
+            "evicted": self.evicted_count,
+            "sessions": len(self.user_id_by_session_id),
+            "pending_expiries": len(self._expiries)
+        }
+
+    def _reaper_loop(self, interval: float) -> None:
+        """
+        Background reaper: evicts expired sessions every `interval` seconds.
+        """
+        while True:
+            time.sleep(interval)
+            self.reap()
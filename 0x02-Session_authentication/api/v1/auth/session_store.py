@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Session stores mapping session IDs to their user ID, or to a dictionary
+with the user ID and the creation time of the session.
+"""
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Iterator
+
+
+class SQLiteSessionStore(MutableMapping):
+    """
+    Session store kept in a SQLite database file, so that every worker
+    process of the server sees the sessions created by the others.
+    """
+
+    # Sessions created by a worker are visible to the others
+    shared = True
+
+    def __init__(self, path: str = ".db_sessions.sqlite3",
+                 timeout: float = 5.0):
+        """
+        Opens (and creates if needed) the session database.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            timeout (float): Seconds to wait for a writer of another worker.
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                       "session_id TEXT PRIMARY KEY, "
+                       "user_id TEXT, created_at REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_created_at "
+                       "ON sessions (created_at)")
+
+    def __getitem__(self, session_id: str):
+        """
+        Returns the value stored for a session.
+        """
+        row = self._connection().execute(
+            "SELECT user_id, created_at FROM sessions WHERE session_id = ?",
+            (session_id,)).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        return self._decode(*row)
+
+    def __setitem__(self, session_id: str, value) -> None:
+        """
+        Stores a user ID, or a dictionary with the user ID and creation
+        time, for a session.
+        """
+        with self._connection() as db:
+            db.execute("INSERT OR REPLACE INTO sessions "
+                       "(session_id, user_id, created_at) VALUES (?, ?, ?)",
+                       (session_id, *self._encode(value)))
+
+    def __delitem__(self, session_id: str) -> None:
+        """
+        Removes a session.
+        """
+        with self._connection() as db:
+            deleted = db.execute("DELETE FROM sessions WHERE session_id = ?",
+                                 (session_id,)).rowcount
+        if not deleted:
+            raise KeyError(session_id)
+
+    def __contains__(self, session_id) -> bool:
+        """
+        Membership test with a single lookup.
+        """
+        return self._connection().execute(
+            "SELECT 1 FROM sessions WHERE session_id = ?",
+            (session_id,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterates over the session IDs.
+        """
+        rows = self._connection().execute(
+            "SELECT session_id FROM sessions").fetchall()
+        return (session_id for session_id, in rows)
+
+    def __len__(self) -> int:
+        """
+        Number of stored sessions.
+        """
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def pop(self, session_id: str, *default):
+        """
+        Removes a session and returns its value, atomically between
+        workers.
+        """
+        db = self._connection()
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            with db:
+                row = db.execute("DELETE FROM sessions WHERE session_id = ? "
+                                 "RETURNING user_id, created_at",
+                                 (session_id,)).fetchone()
+        else:
+            # No RETURNING before SQLite 3.35: lock the database for writes
+            # between the read and the deletion
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT user_id, created_at FROM sessions "
+                                 "WHERE session_id = ?",
+                                 (session_id,)).fetchone()
+                db.execute("DELETE FROM sessions WHERE session_id = ?",
+                           (session_id,))
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+        if row is not None:
+            return self._decode(*row)
+        if default:
+            return default[0]
+        raise KeyError(session_id)
+
+    def purge_created_before(self, created_at: float) -> int:
+        """
+        Removes the sessions created before a time.
+
+        Args:
+            created_at (float): Epoch seconds.
+
+        Returns:
+            int: The number of removed sessions.
+        """
+        with self._connection() as db:
+            return db.execute("DELETE FROM sessions WHERE created_at < ?",
+                              (created_at,)).rowcount
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection of the current thread, opened again in
+        a forked worker.
+        """
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @staticmethod
+    def _encode(value) -> tuple:
+        """
+        Converts a stored value to its (user_id, created_at) columns.
+        """
+        if isinstance(value, dict):
+            created_at = value.get("created_at")
+            if isinstance(created_at, datetime):
+                created_at = created_at.timestamp()
+            return value.get("user_id"), created_at
+        return value, None
+
+    @staticmethod
+    def _decode(user_id: str, created_at: float):
+        """
+        Converts (user_id, created_at) columns back to a stored value.
+        """
+        if created_at is None:
+            return user_id
+        return {"user_id": user_id,
+                "created_at": datetime.fromtimestamp(created_at)}
+
+
+def session_store_from_env() -> MutableMapping:
+    """
+    Builds the session store selected by SESSION_STORE: "memory" (the
+    default, a dictionary private to the process) or "sqlite", in the
+    file SESSION_STORE_PATH.
+    """
+    if os.getenv("SESSION_STORE") == "sqlite":
+        return SQLiteSessionStore(
+            os.getenv("SESSION_STORE_PATH", ".db_sessions.sqlite3"))
+    return {}
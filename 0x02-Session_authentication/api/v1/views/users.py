@@ -1,18 +1,93 @@
 #!/usr/bin/env python3
 """ Module for User views """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from base64 import b64decode, urlsafe_b64encode
+from flask import Response, abort, jsonify, request
 from models.user import User
+import json
+
+
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+USER_FIELDS = ("id", "email", "first_name", "last_name",
+               "created_at", "updated_at")
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (all optional):
+      - limit: page size (at most MAX_PAGE_SIZE), users ordered by ID
+      - cursor: next_cursor of the previous page
+      - fields: comma-separated attributes to return
+      - stream: 1 to stream every user as a chunked JSON list
     Returns:
-      - JSON list of all User objects
+      - JSON list of all User objects, or with limit a page
+        {"users": [...], "next_cursor": cursor or null}
+      - 400 if a parameter is invalid
+    """
+    fields = request.args.get("fields")
+    if fields is not None:
+        fields = fields.split(",")
+        for field in fields:
+            if field not in USER_FIELDS:
+                return jsonify({'error': f"Unknown field: {field}"}), 400
+
+    if request.args.get("stream") == "1":
+        return Response(_stream_users(fields), mimetype="application/json")
+
+    limit = request.args.get("limit")
+    if limit is None:
+        all_users = [_project(user, fields) for user in User.all()]
+        return jsonify(all_users)
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': "Invalid limit"}), 400
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = b64decode(request.args["cursor"], altchars=b"-_",
+                              validate=True).decode()
+        except ValueError:
+            return jsonify({'error': "Invalid cursor"}), 400
+
+    users, last_id = User.page(after, limit)
+    next_cursor = None
+    if last_id is not None:
+        next_cursor = urlsafe_b64encode(last_id.encode()).decode()
+    return jsonify({"users": [_project(user, fields) for user in users],
+                    "next_cursor": next_cursor})
+
+
+def _project(user: User, fields: list) -> dict:
+    """ JSON representation of a user restricted to `fields`
+    """
+    user_json = user.to_json()
+    if fields is None:
+        return user_json
+    return {field: user_json.get(field) for field in fields}
+
+
+def _stream_users(fields: list):
+    """ Generate a JSON list of all users, STREAM_CHUNK_SIZE at a time
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    yield "["
+    chunk = []
+    separator = ""
+    for user in User.iter_all():
+        chunk.append(json.dumps(_project(user, fields),
+                                separators=(",", ":")))
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield separator + ",".join(chunk)
+            separator = ","
+            chunk = []
+    if chunk:
+        yield separator + ",".join(chunk)
+    yield "]\n"
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the per-login cost of each password hash scheme: the
+legacy SHA-256 digest and PBKDF2-SHA256 at several iteration counts,
+and the first login of a migrated user, which verifies the legacy hash
+and rehashes the password:
+
+    ./bench_password_kdf.py [iterations ...]
+"""
+import sys
+import time
+
+from models.user import hash_password, verify_password
+
+
+def per_call(call, seconds: float = 1.0) -> float:
+    """ Average duration of `call`, repeated for about `seconds`
+    """
+    count = 0
+    start = time.perf_counter()
+    while True:
+        call()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds and count >= 3:
+            return elapsed / count
+
+
+def report(label: str, duration: float) -> None:
+    """ Print a duration and the logins per second of one core
+    """
+    print("  {:<28} {:10.3f}ms  {:10.0f} logins/s/core".format(
+        label, duration * 1e3, 1 / duration))
+
+
+def main() -> None:
+    """ Time a login with each scheme and cost
+    """
+    costs = [int(arg) for arg in sys.argv[1:]] or [
+        10000, 100000, 300000, 600000]
+    pwd = "correct horse battery staple"
+    legacy = hash_password(pwd, "sha256")
+
+    print("verify_password")
+    report("sha256", per_call(lambda: verify_password(pwd, legacy)))
+    for iterations in costs:
+        hashed = hash_password(pwd, "pbkdf2_sha256", iterations)
+        report("pbkdf2_sha256 {}".format(iterations),
+               per_call(lambda: verify_password(pwd, hashed)))
+
+    print("first login after migration (verify sha256 + rehash)")
+    for iterations in costs:
+        report("to pbkdf2_sha256 {}".format(iterations), per_call(
+            lambda: verify_password(pwd, legacy) and
+            hash_password(pwd, "pbkdf2_sha256", iterations)))
+
+
+if __name__ == "__main__":
+    main()
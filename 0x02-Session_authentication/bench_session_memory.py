@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark of the UserSession objects held in DATA, with the
+default representation and with MODELS_COMPACT=1. Rows are built the
+way load_from_file builds them, each from its own JSON strings, and
+the growth of the resident set is reported per row and for 1M rows:
+
+    ./bench_session_memory.py [rows] [users]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import uuid
+
+
+def build(rows: int, users: int) -> int:
+    """ Load `rows` sessions of `users` users into DATA, returning the
+    memory they hold
+    """
+    from models.base import DATA, intern_str
+    from models.user_session import UserSession
+
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    DATA["UserSession"] = {}
+    objs = DATA["UserSession"]
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for i in range(rows):
+        user_id = user_ids[i % users]
+        # A new string per row, as when decoded from the JSON file
+        obj_json = {
+            "id": str(uuid.uuid4()),
+            "created_at": "2026-10-17T06:20:52",
+            "updated_at": "2026-10-17T06:20:52",
+            "user_id": user_id[:18] + user_id[18:],
+            "session_id": str(uuid.uuid4()),
+        }
+        obj = UserSession(**obj_json)
+        objs[intern_str(obj.id)] = obj
+    # ru_maxrss is in KB on Linux; the temporaries of a row are freed
+    # at once, so the peak is what the sessions keep
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss -
+            before) * 1024
+
+
+def main() -> None:
+    """ Measure each representation in a fresh process
+    """
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    if os.getenv("BENCH_RUN") == "1":
+        print(build(rows, users))
+        return
+
+    project = os.path.dirname(os.path.abspath(__file__))
+    print("{} sessions of {} users".format(rows, users))
+    for label, compact in (("default", "0"), ("compact", "1")):
+        env = dict(os.environ, BENCH_RUN="1", MODELS_COMPACT=compact,
+                   PYTHONPATH=project)
+        with tempfile.TemporaryDirectory() as directory:
+            used = int(subprocess.run(
+                [sys.executable, os.path.abspath(__file__),
+                 str(rows), str(users)],
+                cwd=directory, env=env, check=True,
+                stdout=subprocess.PIPE).stdout)
+        print("  {:<8} {:6.1f} bytes/session  {:7.1f} MB per 1M".format(
+            label, used / rows, used / rows * 1e6 / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark of session lookups through SessionAuth with the shared SQLite
+store (SESSION_STORE=sqlite), from 1 to 16 forked worker processes
+looking sessions up at the same time. Process startup is excluded:
+workers start counting together, for a fixed duration.
+
+    ./bench_session_store.py [processes ...]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+SESSIONS = 10000
+DURATION = 2.0
+
+
+def worker(auth, session_ids: list, barrier, results) -> None:
+    """ Look sessions up for DURATION seconds, then report the count
+    """
+    rng = random.Random(os.getpid())
+    count = 0
+    barrier.wait()
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            if auth.user_id_for_session_id(rng.choice(session_ids)) is None:
+                raise AssertionError("session not found")
+        count += 100
+    results.put(count)
+
+
+def main() -> None:
+    """ Create the sessions, then measure each number of processes
+    """
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8, 16]
+    os.environ["SESSION_STORE"] = "sqlite"
+    os.environ["SESSION_STORE_PATH"] = os.path.join(
+        tempfile.mkdtemp(), "sessions.sqlite3")
+    from api.v1.auth.session_auth import SessionAuth
+
+    auth = SessionAuth()
+    session_ids = [auth.create_session("user-{}".format(i))
+                   for i in range(SESSIONS)]
+    context = multiprocessing.get_context("fork")
+    print("{} CPUs, {} sessions, {:.0f}s per run".format(
+        os.cpu_count(), SESSIONS, DURATION))
+    for processes in counts:
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [context.Process(target=worker,
+                                   args=(auth, session_ids, barrier,
+                                         results))
+                   for _ in range(processes)]
+        for process in workers:
+            process.start()
+        total = sum(results.get() for _ in workers)
+        for process in workers:
+            process.join()
+        print("  {:>2} processes {:>10.0f} lookups/s".format(
+            processes, total / DURATION))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark of Base.to_json against the previous implementation, which
+called strftime for every timestamp and, in compact mode, walked the
+slots of the MRO on every call. Two workloads: the to_json list of a
+GET /api/v1/users response, and a FileStorage snapshot. Both modes,
+default and MODELS_COMPACT=1, run in fresh processes:
+
+    ./bench_to_json.py [users]
+
+Timestamps are spread over a year, as in a long-lived user table.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timedelta
+
+
+def old_attributes(obj) -> list:
+    """ The previous Base._attributes, kept for comparison
+    """
+    from models.base import COMPACT, TIMESTAMP_FORMAT
+
+    if not COMPACT:
+        return list(obj.__dict__.items())
+    attributes = []
+    for klass in reversed(type(obj).__mro__):
+        for slot in klass.__dict__.get("__slots__", ()):
+            value = getattr(obj, slot)
+            if slot in ("_created_ts", "_updated_ts"):
+                slot = slot[1:-3] + "_at"
+                if value is not None:
+                    value = time.strftime(TIMESTAMP_FORMAT,
+                                          time.gmtime(value))
+            attributes.append((slot, value))
+    return attributes
+
+
+def old_to_json(self, for_serialization: bool = False) -> dict:
+    """ The previous Base.to_json, kept for comparison
+    """
+    from models.base import TIMESTAMP_FORMAT
+
+    result = {}
+    for key, value in old_attributes(self):
+        if not for_serialization and key[0] == '_':
+            continue
+        if type(value) is datetime:
+            result[key] = value.strftime(TIMESTAMP_FORMAT)
+        else:
+            result[key] = value
+    return result
+
+
+def run(count: int) -> dict:
+    """ Time both workloads with the old and the new to_json
+    """
+    from models.base import Base, DATA, STORAGE
+    from models.user import User
+
+    start = datetime(2025, 10, 17)
+    DATA["User"] = {}
+    for i in range(count):
+        user = User(email="user{}@bench".format(i))
+        user.password = "pwd"
+        user.created_at = start + timedelta(seconds=i * 31536000 // count)
+        user.updated_at = user.created_at + timedelta(hours=1)
+        DATA["User"][user.id] = user
+    users = list(DATA["User"].values())
+    new_to_json = Base.to_json
+    assert all(old_to_json(user, True) == new_to_json(user, True)
+               for user in users[:100])
+
+    workloads = (
+        ("to_json list", lambda: [user.to_json() for user in users]),
+        ("FileStorage.save_all",
+         lambda: STORAGE.save_all("User", DATA["User"])),
+    )
+    results = {}
+    for label, workload in workloads:
+        for version, to_json in (("old", old_to_json),
+                                 ("new", new_to_json)):
+            Base.to_json = to_json
+            results[label + " " + version] = min(
+                timeit.repeat(workload, number=1, repeat=3))
+    Base.to_json = new_to_json
+    return results
+
+
+def main() -> None:
+    """ Run each mode in a fresh process and directory
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if os.getenv("BENCH_RUN") == "1":
+        print(json.dumps(run(count)))
+        return
+
+    project = os.path.dirname(os.path.abspath(__file__))
+    print("{} users".format(count))
+    print("{:<8} {:<21} {:>8} {:>8}".format(
+        "mode", "workload", "old", "new"))
+    for mode, compact in (("default", "0"), ("compact", "1")):
+        env = dict(os.environ, BENCH_RUN="1", MODELS_COMPACT=compact,
+                   PYTHONPATH=project)
+        with tempfile.TemporaryDirectory() as directory:
+            results = json.loads(subprocess.run(
+                [sys.executable, os.path.abspath(__file__), str(count)],
+                cwd=directory, env=env, check=True,
+                stdout=subprocess.PIPE).stdout)
+        for label in ("to_json list", "FileStorage.save_all"):
+            print("{:<8} {:<21} {:>7.3f}s {:>7.3f}s".format(
+                mode, label, results[label + " old"],
+                results[label + " new"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark of GET /api/v1/users: full list, cursor pages and streamed
+export, for growing user tables; peak memory is traced up to 100k
+users. Runs in a temporary directory:
+
+    ./bench_users_pagination.py 100000 1000000
+"""
+import base64
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def populate(count: int) -> None:
+    """ Write `count` users to disk and load them back
+    """
+    from models.base import DATA
+    from models.user import User
+
+    User.load_from_file()
+    for i in range(count):
+        user = User()
+        user.email = "user{}@bench".format(i)
+        DATA["User"][user.id] = user
+    User.save_to_file()
+    User.load_from_file()
+
+
+def measure(client, url: str, headers: dict, trace: bool) -> tuple:
+    """ Time a request reading the whole body, then trace its peak
+    memory in a second run when `trace` is set
+    """
+    start = time.perf_counter()
+    response = client.get(url, headers=headers)
+    size = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        tracemalloc.start()
+        response = client.get(url, headers=headers)
+        for chunk in response.response:
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def traverse(limit: int) -> tuple:
+    """ Walk every page through Base.page, returning the time and the
+    number of users seen
+    """
+    from models.user import User
+
+    start = time.perf_counter()
+    seen = 0
+    after = None
+    while True:
+        users, after = User.page(after, limit)
+        seen += len(users)
+        if after is None:
+            return time.perf_counter() - start, seen
+
+
+def main() -> None:
+    """ Benchmark each table size given on the command line
+    """
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000]
+    os.environ.setdefault("AUTH_TYPE", "basic_auth")
+    os.chdir(tempfile.mkdtemp())
+    from api.v1.app import app
+    from models.user import User
+
+    admin = User()
+    admin.email = "admin@bench"
+    admin.password = "pwd"
+    admin.save()
+    credentials = base64.b64encode(b"admin@bench:pwd").decode()
+    headers = {"Authorization": "Basic " + credentials}
+    client = app.test_client()
+
+    done = 1
+    for size in sizes:
+        populate(size - done)
+        done = size
+        print("{} users".format(User.count()))
+        cursor = client.get("/api/v1/users?limit=1000",
+                            headers=headers).json["next_cursor"]
+        for label, url in (
+                ("first page", "/api/v1/users?limit=100"),
+                ("later page", "/api/v1/users?limit=100&cursor=" + cursor),
+                ("stream", "/api/v1/users?stream=1"),
+                ("full list", "/api/v1/users")):
+            if label == "full list" and size > 100000:
+                continue
+            elapsed, peak, length = measure(client, url, headers,
+                                            size <= 100000)
+            peak = "" if peak is None else \
+                "peak {:6.1f} MB".format(peak / 2 ** 20)
+            print("  {:<11} {:8.3f}s  {} bytes  {}".format(
+                label, elapsed, length, peak))
+        elapsed, seen = traverse(1000)
+        print("  {:<11} {:8.3f}s  {} users, pages of 1000".format(
+            "traversal", elapsed, seen))
+
+
+if __name__ == "__main__":
+    main()
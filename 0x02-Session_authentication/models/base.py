@@ -1,21 +1,154 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from datetime import datetime, timedelta
+from functools import lru_cache
+from os import getenv
+from typing import TypeVar, List, Iterable, Iterator, Tuple
+from models.storage import LazyObjects, lazy_load_from_env, storage_from_env
+import bisect
 import json
+import sys
+import threading
+import time
 import uuid
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+INDEXES = {}
+ORDERED_IDS = {}
+LAZY_LOAD = lazy_load_from_env()
+COMPACT = getenv("MODELS_COMPACT", "0") == "1"
+EPOCH = datetime(1970, 1, 1)
+LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def class_lock(s_class: str) -> threading.RLock:
+    """ Lock serializing the writers of a class: mutations of its
+    objects and indexes, and their persistence. Readers don't take it
+    and only iterate over atomic copies of the ID lists.
+    """
+    lock = LOCKS.get(s_class)
+    if lock is None:
+        with _LOCKS_GUARD:
+            lock = LOCKS.setdefault(s_class, threading.RLock())
+    return lock
+
+
+STORAGE = storage_from_env(class_lock)
+
+
+def epoch_property(slot: str) -> property:
+    """ Datetime attribute stored as integer seconds since the epoch
+    in `slot`, used by the compact representation
+    """
+    def getter(self) -> datetime:
+        ts = getattr(self, slot)
+        return None if ts is None else EPOCH + timedelta(seconds=ts)
+
+    def setter(self, value: datetime):
+        if value is not None:
+            value = int((value - EPOCH).total_seconds())
+        setattr(self, slot, value)
+
+    return property(getter, setter)
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(value: datetime) -> str:
+    """ TIMESTAMP_FORMAT string of a datetime, cached since many
+    objects share timestamps and each one is serialized many times
+    """
+    return value.isoformat("T", "seconds")
+
+
+@lru_cache(maxsize=4096)
+def format_epoch(ts: int) -> str:
+    """ TIMESTAMP_FORMAT string of seconds since the epoch
+    """
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(ts))
+
+
+def intern_str(value):
+    """ Intern strings shared by many objects in compact mode
+    """
+    if COMPACT and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class OrderedIds():
+    """ Sorted IDs of a class, used to paginate from a cursor. Writers
+    hold the class lock; readers don't and retry when a writer changed
+    the IDs meanwhile
+    """
+
+    def __init__(self, ids: Iterable[str] = ()):
+        """ Initialize an OrderedIds instance
+        """
+        self._ids = sorted(ids)
+        # Odd while a writer is changing the IDs
+        self._version = 0
+
+    def add(self, obj_id: str):
+        """ Insert an ID, if new
+        """
+        i = bisect.bisect_left(self._ids, obj_id)
+        if i < len(self._ids) and self._ids[i] == obj_id:
+            return
+        self._version += 1
+        self._ids.insert(i, obj_id)
+        self._version += 1
+
+    def discard(self, obj_id: str):
+        """ Remove an ID, if present
+        """
+        i = bisect.bisect_left(self._ids, obj_id)
+        if i == len(self._ids) or self._ids[i] != obj_id:
+            return
+        self._version += 1
+        del self._ids[i]
+        self._version += 1
+
+    def after(self, after: str, limit: int) -> Tuple[List[str], bool]:
+        """ Return up to `limit` IDs following `after` (from the first
+        one when None), and whether more IDs follow them
+        """
+        while True:
+            version = self._version
+            if version % 2 == 0:
+                start = 0
+                if after is not None:
+                    start = bisect.bisect_right(self._ids, after)
+                ids = self._ids[start:start + limit + 1]
+                if version == self._version:
+                    return ids[:limit], len(ids) > limit
+            time.sleep(0)
+
+    def __len__(self) -> int:
+        """ Number of IDs
+        """
+        return len(self._ids)
 
 
 class Base():
     """ Base class
     """
 
+    # Attributes kept in a hash index and used by search()
+    indexed_attributes = ()
+
+    if COMPACT:
+        __slots__ = ("id", "_created_ts", "_updated_ts")
+        created_at = epoch_property("_created_ts")
+        updated_at = epoch_property("_updated_ts")
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -23,7 +156,7 @@ class Base():
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
 
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        self.id = intern_str(kwargs.get('id', str(uuid.uuid4())))
         if kwargs.get('created_at') is not None:
             self.created_at = datetime.strptime(kwargs.get('created_at'),
                                                 TIMESTAMP_FORMAT)
@@ -48,58 +181,128 @@ class Base():
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._attributes():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                result[key] = format_timestamp(value)
             else:
                 result[key] = value
         return result
 
+    def to_json_bytes(self, for_serialization: bool = False) -> bytes:
+        """ Encoded JSON of the object, with orjson when installed
+        """
+        if orjson is not None:
+            return orjson.dumps(self.to_json(for_serialization))
+        return json.dumps(self.to_json(for_serialization)).encode()
+
+    def _attributes(self) -> Iterable[Tuple[str, object]]:
+        """ Attributes of the object, timestamps of the compact
+        representation being converted only here
+        """
+        if not COMPACT:
+            # Copied at once, the object may be updated concurrently
+            return list(self.__dict__.items())
+        attributes = []
+        for slot, key in self.__class__._slot_plan():
+            value = getattr(self, slot)
+            if key is not slot and value is not None:
+                value = format_epoch(value)
+            attributes.append((key, value))
+        return attributes
+
+    @classmethod
+    def _slot_plan(cls) -> List[Tuple[str, str]]:
+        """ (slot, JSON key) pairs of the compact representation,
+        built once per class
+        """
+        plan = cls.__dict__.get("_slot_plan_cache")
+        if plan is None:
+            plan = []
+            for klass in reversed(cls.__mro__):
+                for slot in klass.__dict__.get("__slots__", ()):
+                    if slot in ("_created_ts", "_updated_ts"):
+                        plan.append((slot, slot[1:-3] + "_at"))
+                    else:
+                        plan.append((slot, slot))
+            cls._slot_plan_cache = plan
+        return plan
+
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        with class_lock(s_class):
+            # Unwritten saves would be dropped from memory here, then
+            # written over the reloaded file by the flusher
+            STORAGE.flush(s_class)
+            INDEXES[s_class] = {}
+            if not LAZY_LOAD:
+                DATA[s_class] = {}
+                for obj_id, obj_json in STORAGE.load(s_class).items():
+                    obj = cls(**obj_json)
+                    DATA[s_class][intern_str(obj_id)] = obj
+                    cls._index_add(obj_id, obj_json)
+                ORDERED_IDS[s_class] = OrderedIds(DATA[s_class])
+                return
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+            # Only index record locations; objects are built on first access
+            objs = LazyObjects(cls, STORAGE, class_lock(s_class))
+            DATA[s_class] = objs
+            for obj_id, locator, obj_json in STORAGE.scan(s_class):
+                if obj_json is None:
+                    objs.pop(obj_id, None)
+                    cls._index_discard(obj_id)
+                    continue
+                if locator is None:
+                    objs[obj_id] = cls(**obj_json)
+                else:
+                    objs.locate(obj_id, locator)
+                cls._index_add(obj_id, obj_json)
+            ORDERED_IDS[s_class] = OrderedIds(objs)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
-
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        with class_lock(s_class):
+            STORAGE.save_all(s_class, DATA[s_class])
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with class_lock(s_class):
+            DATA[s_class][self.id] = self
+            self.__class__._ordered_ids().add(self.id)
+            self.__class__._index_add(self.id, {
+                attr: getattr(self, attr, None)
+                for attr in self.__class__.indexed_attributes
+            })
+            STORAGE.record_save(s_class, DATA[s_class], self.id)
+        STORAGE.commit(s_class)
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with class_lock(s_class):
+            if DATA[s_class].get(self.id) is not None:
+                del DATA[s_class][self.id]
+                self.__class__._ordered_ids().discard(self.id)
+                self.__class__._index_discard(self.id)
+                STORAGE.record_remove(s_class, DATA[s_class], self.id)
+        STORAGE.commit(s_class)
+
+    @staticmethod
+    def flush():
+        """ Write the saves and removals not persisted yet
+        """
+        STORAGE.flush()
 
     @classmethod
     def count(cls) -> int:
@@ -114,6 +317,47 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def iter_all(cls) -> Iterator[TypeVar('Base')]:
+        """ Iterate over all objects without keeping the ones not
+        loaded yet in memory
+        """
+        objs = DATA[cls.__name__]
+        peek = getattr(objs, "peek", objs.get)
+        for obj_id in list(objs):
+            obj = peek(obj_id)
+            if obj is not None:
+                yield obj
+
+    @classmethod
+    def page(cls, after: str = None,
+             limit: int = 100) -> Tuple[List[TypeVar('Base')], str]:
+        """ Return up to `limit` objects ordered by ID, starting after
+        the ID `after`, and the ID to start the next page after (None
+        on the last page)
+        """
+        ids, more = cls._ordered_ids().after(after, limit)
+        objs = DATA[cls.__name__]
+        peek = getattr(objs, "peek", objs.get)
+        page = (peek(obj_id) for obj_id in ids)
+        # The cursor follows the selected IDs, even if the last object
+        # was removed since
+        return ([obj for obj in page if obj is not None],
+                ids[-1] if more else None)
+
+    @classmethod
+    def _ordered_ids(cls) -> OrderedIds:
+        """ Sorted IDs of the class
+        """
+        ordered_ids = ORDERED_IDS.get(cls.__name__)
+        if ordered_ids is None:
+            with class_lock(cls.__name__):
+                ordered_ids = ORDERED_IDS.get(cls.__name__)
+                if ordered_ids is None:
+                    ordered_ids = OrderedIds(DATA.get(cls.__name__, ()))
+                    ORDERED_IDS[cls.__name__] = ordered_ids
+        return ordered_ids
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
@@ -121,6 +365,62 @@ class Base():
         s_class = cls.__name__
         return DATA[s_class].get(id)
 
+    @classmethod
+    def _index_add(cls, obj_id: str, values: dict):
+        """ Add or refresh an object in the class indexes, from its
+        attributes or its serialized form
+        """
+        indexes = INDEXES.setdefault(cls.__name__, {})
+        for attr in cls.indexed_attributes:
+            by_value, by_id = indexes.setdefault(attr, ({}, {}))
+            value = values.get(attr)
+            if obj_id in by_id:
+                if by_id[obj_id] == value:
+                    continue
+                cls._index_unlink(by_value, by_id, obj_id)
+            try:
+                by_value.setdefault(value, {})[obj_id] = None
+            except TypeError:
+                # Unhashable values stay reachable through a full scan
+                continue
+            by_id[obj_id] = value
+
+    @classmethod
+    def _index_discard(cls, obj_id: str):
+        """ Remove an object from the class indexes
+        """
+        for by_value, by_id in INDEXES.get(cls.__name__, {}).values():
+            if obj_id in by_id:
+                cls._index_unlink(by_value, by_id, obj_id)
+
+    @staticmethod
+    def _index_unlink(by_value: dict, by_id: dict, obj_id: str):
+        """ Unlink one object ID from an attribute index
+        """
+        value = by_id.pop(obj_id)
+        ids = by_value[value]
+        del ids[obj_id]
+        if len(ids) == 0:
+            del by_value[value]
+
+    @classmethod
+    def _index_lookup(cls, attributes: dict) -> Iterable[str]:
+        """ Return candidate IDs from the narrowest usable index,
+        or None when no queried attribute is indexed
+        """
+        indexes = INDEXES.get(cls.__name__, {})
+        candidates = None
+        for k, v in attributes.items():
+            if k not in indexes:
+                continue
+            try:
+                ids = indexes[k][0].get(v, {})
+            except TypeError:
+                continue
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        return candidates
+
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
@@ -133,5 +433,13 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        objs = DATA[s_class]
+        ids = cls._index_lookup(attributes)
+        if ids is None:
+            ids = objs
+        # list() copies the IDs at once, so writers can't change them
+        # during the iteration
+        candidates = (objs.get(obj_id) for obj_id in list(ids))
+        return [obj for obj in candidates
+                if obj is not None and _search(obj)]
@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+from collections.abc import MutableMapping
+from os import getenv, path
+from typing import Callable, Iterator, Tuple
+import atexit
+import json
+import os
+import threading
+
+
+class LazyObjects(MutableMapping):
+    """ Objects of a class keyed by ID, where entries not yet accessed
+    are only a (file path, offset) locator of their serialized record
+    """
+
+    def __init__(self, cls: type, storage: 'FileStorage', lock=None):
+        """ Initialize a LazyObjects instance; `lock` is held by the
+        writers rewriting the files the locators point to
+        """
+        self._cls = cls
+        self._storage = storage
+        self._lock = lock if lock is not None else threading.RLock()
+        self._entries = {}
+
+    def locate(self, obj_id: str, locator: tuple):
+        """ Register an object not loaded yet
+        """
+        self._entries[obj_id] = locator
+
+    def relocate(self, file_path: str, offsets: dict):
+        """ Point the objects not loaded yet to a new snapshot file
+        """
+        for obj_id, entry in self._entries.items():
+            if type(entry) is tuple:
+                self._entries[obj_id] = (file_path, offsets[obj_id])
+
+    def peek(self, obj_id: str):
+        """ Return an object without caching it when it is not loaded,
+        or None when it doesn't exist
+        """
+        entry = self._entries.get(obj_id)
+        if type(entry) is tuple:
+            with self._lock:
+                entry = self._entries.get(obj_id)
+                if type(entry) is tuple:
+                    return self._cls(**self._read(obj_id, entry))
+        return entry
+
+    def raw_items(self) -> Iterator[Tuple[str, dict]]:
+        """ Iterate over serialized objects without loading them
+        """
+        with self._lock:
+            for obj_id, entry in self._entries.items():
+                if type(entry) is tuple:
+                    yield obj_id, self._read(obj_id, entry)
+                else:
+                    yield obj_id, entry.to_json(True)
+
+    def __getitem__(self, obj_id: str):
+        """ Return an object, loading it on first access
+        """
+        entry = self._entries[obj_id]
+        if type(entry) is tuple:
+            # Locators are only valid until a writer rewrites the file
+            with self._lock:
+                entry = self._entries[obj_id]
+                if type(entry) is tuple:
+                    entry = self._cls(**self._read(obj_id, entry))
+                    self._entries[obj_id] = entry
+        return entry
+
+    def _read(self, obj_id: str, locator: tuple) -> dict:
+        """ Read the record of an object, checking that the locator
+        points to that object
+        """
+        obj_json = self._storage.read(locator)
+        if obj_json is None or obj_json.get("id") != obj_id:
+            raise ValueError("Stale locator for {}".format(obj_id))
+        return obj_json
+
+    def __setitem__(self, obj_id: str, obj):
+        """ Store a loaded object
+        """
+        self._entries[obj_id] = obj
+
+    def __delitem__(self, obj_id: str):
+        """ Forget an object
+        """
+        del self._entries[obj_id]
+
+    def __contains__(self, obj_id) -> bool:
+        """ Membership test that doesn't load the object
+        """
+        return obj_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over IDs
+        """
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        """ Number of objects
+        """
+        return len(self._entries)
+
+
+class FileStorage():
+    """ Whole-file storage: every mutation rewrites .db_<Class>.json
+    """
+
+    # Whether snapshots reach the disk before save_all returns
+    fsync = False
+
+    def file_path(self, s_class: str) -> str:
+        """ Path of the snapshot file of a class
+        """
+        return ".db_{}.json".format(s_class)
+
+    def load(self, s_class: str) -> dict:
+        """ Return all serialized objects of a class, keyed by ID
+        """
+        file_path = self.file_path(s_class)
+        if not path.exists(file_path):
+            return {}
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+    def scan(self, s_class: str) -> Iterator[Tuple[str, tuple, dict]]:
+        """ Iterate over (ID, locator, serialized object) of a class;
+        the locator is None when the record can't be read back alone
+        and the serialized object is None when the object was removed
+        """
+        file_path = self.file_path(s_class)
+        if not path.exists(file_path):
+            return
+        with open(file_path, 'rb') as f:
+            first = f.readline()
+            if first != b"{\n":
+                # Snapshot written on a single line
+                f.seek(0)
+                for obj_id, obj_json in json.load(f).items():
+                    yield obj_id, None, obj_json
+                return
+            offset = len(first)
+            for line in f:
+                if line[:1] == b'"':
+                    obj_id, obj_json = self._parse_line(line)
+                    yield obj_id, (file_path, offset), obj_json
+                offset += len(line)
+
+    def read(self, locator: tuple) -> dict:
+        """ Read back one serialized object from its locator
+        """
+        file_path, offset = locator
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            return self._parse_line(f.readline())[1]
+
+    def save_all(self, s_class: str, objs: dict):
+        """ Write a full snapshot of a class, one object per line
+        """
+        file_path = self.file_path(s_class)
+        # Per process, so that workers never write to the same file
+        tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+        offsets = {}
+        with open(tmp_path, 'wb') as f:
+            offset = f.write(b"{")
+            for obj_id, obj_json in self.serialize(objs):
+                if offsets:
+                    offset += f.write(b",")
+                offset += f.write(b"\n")
+                offsets[obj_id] = offset
+                line = "{}: {}".format(json.dumps(obj_id),
+                                       json.dumps(obj_json))
+                offset += f.write(line.encode())
+            f.write(b"\n}\n")
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        if self.fsync:
+            self._fsync_dir(file_path)
+        if isinstance(objs, LazyObjects):
+            objs.relocate(file_path, offsets)
+
+    def record_save(self, s_class: str, objs: dict, obj_id: str):
+        """ Persist the creation or update of one object
+        """
+        self.save_all(s_class, objs)
+
+    def record_remove(self, s_class: str, objs: dict, obj_id: str):
+        """ Persist the deletion of one object
+        """
+        self.save_all(s_class, objs)
+
+    def commit(self, s_class: str):
+        """ Wait until the recorded mutations of a class are written;
+        they already are
+        """
+
+    def flush(self, s_class: str = None):
+        """ Write the pending mutations of a class, or of every class;
+        there are none
+        """
+
+    @staticmethod
+    def serialize(objs: dict) -> Iterator[Tuple[str, dict]]:
+        """ Iterate over the serialized objects of a dictionary keyed by ID
+        """
+        if isinstance(objs, LazyObjects):
+            return objs.raw_items()
+        return ((obj_id, obj.to_json(True)) for obj_id, obj in objs.items())
+
+    @staticmethod
+    def _fsync_dir(file_path: str):
+        """ Make the renaming of a file durable
+        """
+        fd = os.open(path.dirname(file_path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Tuple[str, dict]:
+        """ Parse one record of a snapshot or of a journal
+        """
+        if line[:1] == b'"':
+            record = json.loads(b"{" + line.rstrip(b",\n") + b"}")
+            return next(iter(record.items()))
+        record = json.loads(line)
+        return record["id"], record.get("obj")
+
+
+class JournalStorage(FileStorage):
+    """ Append-only storage: every mutation appends one record to
+    .db_<Class>.journal, and the journal is compacted into the
+    snapshot file every `compact_every` records
+    """
+
+    def __init__(self, compact_every: int = 1000, fsync: bool = False):
+        """ Initialize a JournalStorage instance
+        """
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._journals = {}
+        self._pending = {}
+
+    def journal_path(self, s_class: str) -> str:
+        """ Path of the journal file of a class
+        """
+        return ".db_{}.journal".format(s_class)
+
+    def load(self, s_class: str) -> dict:
+        """ Return the snapshot with the journal replayed on top of it
+        """
+        objs_json = super().load(s_class)
+        for offset, record in self._replay(s_class):
+            self._apply(objs_json, record)
+        return objs_json
+
+    def scan(self, s_class: str) -> Iterator[Tuple[str, tuple, dict]]:
+        """ Iterate over the snapshot records, then the journal ones
+        """
+        yield from super().scan(s_class)
+        journal_path = self.journal_path(s_class)
+        for offset, record in self._replay(s_class):
+            if record.get("op") == "save":
+                yield record["id"], (journal_path, offset), record["obj"]
+            elif record.get("op") == "remove":
+                yield record["id"], None, None
+
+    def save_all(self, s_class: str, objs: dict):
+        """ Write a full snapshot of a class and reset its journal; with
+        fsync, the snapshot is durable before the journal is truncated
+        """
+        super().save_all(s_class, objs)
+        self._close(s_class)
+        with open(self.journal_path(s_class), 'w'):
+            pass
+        self._pending[s_class] = 0
+
+    def record_save(self, s_class: str, objs: dict, obj_id: str):
+        """ Append the new state of one object to the journal
+        """
+        record = {"op": "save", "id": obj_id,
+                  "obj": objs[obj_id].to_json(True)}
+        self._append(s_class, objs, record)
+
+    def record_remove(self, s_class: str, objs: dict, obj_id: str):
+        """ Append the deletion of one object to the journal
+        """
+        self._append(s_class, objs, {"op": "remove", "id": obj_id})
+
+    def compact(self, s_class: str, objs: dict):
+        """ Fold the journal of a class into its snapshot
+        """
+        self.save_all(s_class, objs)
+
+    def _replay(self, s_class: str) -> Iterator[Tuple[int, dict]]:
+        """ Iterate over (offset, record) of the journal of a class
+        and drop a torn record left at its end by a crash
+        """
+        journal_path = self.journal_path(s_class)
+        self._close(s_class)
+        self._pending[s_class] = 0
+        if not path.exists(journal_path):
+            return
+
+        valid_size = 0
+        with open(journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                yield valid_size, record
+                valid_size += len(line)
+                self._pending[s_class] += 1
+        if valid_size != path.getsize(journal_path):
+            with open(journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def _append(self, s_class: str, objs: dict, record: dict):
+        """ Write one journal record, compacting when it is due
+        """
+        f = self._journals.get(s_class)
+        if f is None:
+            f = open(self.journal_path(s_class), 'a')
+            self._journals[s_class] = f
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self._pending[s_class] = self._pending.get(s_class, 0) + 1
+        if self._pending[s_class] >= self.compact_every:
+            self.compact(s_class, objs)
+
+    def _close(self, s_class: str):
+        """ Close the open journal handle of a class, if any
+        """
+        f = self._journals.pop(s_class, None)
+        if f is not None:
+            f.close()
+
+    @staticmethod
+    def _apply(objs_json: dict, record: dict):
+        """ Apply one journal record to serialized objects
+        """
+        if record.get("op") == "save":
+            objs_json[record["id"]] = record["obj"]
+        elif record.get("op") == "remove":
+            objs_json.pop(record["id"], None)
+
+
+class GroupCommitStorage():
+    """ Coalescing storage: mutations only mark their class dirty, and a
+    flusher thread writes a full snapshot of each dirty class through the
+    wrapped backend at most every `interval` seconds, or as soon as
+    `max_pending` mutations are waiting. When `wait` is set, commit()
+    blocks until the mutations recorded so far are written and wakes the
+    flusher at once, the writers committing meanwhile sharing the next
+    write; otherwise up to `interval` seconds of mutations are lost on a
+    crash.
+    """
+
+    def __init__(self, backend: FileStorage, interval: float = 1.0,
+                 max_pending: int = 100, wait: bool = False,
+                 lock_for: Callable = None):
+        """ Initialize a GroupCommitStorage instance
+        """
+        self.backend = backend
+        self.interval = interval
+        self.max_pending = max_pending
+        self.wait = wait
+        self._lock_for = lock_for
+        self._cond = threading.Condition()
+        self._dirty = {}
+        # Last dictionary recorded for each class, still needed once the
+        # flusher has taken it out of _dirty
+        self._objs = {}
+        self._pending = 0
+        self._recorded = {}
+        self._written = {}
+        self._error = None
+        self._closed = False
+        self._waiting = 0
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self.flushes = 0
+
+    def __getattr__(self, name: str):
+        """ Reads and paths are delegated to the wrapped backend
+        """
+        return getattr(self.backend, name)
+
+    def save_all(self, s_class: str, objs: dict):
+        """ Write a full snapshot of a class now
+        """
+        with self._cond:
+            self._dirty.pop(s_class, None)
+            recorded = self._recorded.get(s_class, 0)
+        self.backend.save_all(s_class, objs)
+        self._mark_written(s_class, recorded)
+
+    def record_save(self, s_class: str, objs: dict, obj_id: str):
+        """ Mark a class dirty after the creation or update of an object
+        """
+        self._record(s_class, objs)
+
+    def record_remove(self, s_class: str, objs: dict, obj_id: str):
+        """ Mark a class dirty after the deletion of an object
+        """
+        self._record(s_class, objs)
+
+    def commit(self, s_class: str):
+        """ In wait mode, block until the mutations of a class recorded
+        so far are written
+        """
+        if not self.wait:
+            return
+        with self._cond:
+            target = self._recorded.get(s_class, 0)
+            if self._written.get(s_class, 0) >= target:
+                return
+            # Wake the flusher: one write covers every waiting committer
+            self._waiting += 1
+            self._cond.notify_all()
+            try:
+                while self._written.get(s_class, 0) < target:
+                    if self._error is not None:
+                        raise self._error
+                    self._cond.wait(self.interval)
+            finally:
+                self._waiting -= 1
+
+    def flush(self, s_class: str = None):
+        """ Write every dirty class now, or only `s_class`: the caller
+        then holds the lock of the class
+        """
+        if s_class is not None:
+            self._flush_class(s_class)
+            return
+        with self._flush_lock:
+            with self._cond:
+                dirty = self._dirty
+                self._dirty = {}
+                self._pending = 0
+                recorded = dict(self._recorded)
+            try:
+                for s_class, objs in dirty.items():
+                    if self._lock_for is None:
+                        self.backend.save_all(s_class, objs)
+                    else:
+                        with self._lock_for(s_class):
+                            # Already written by flush(s_class)
+                            if self._written.get(s_class, 0) >= \
+                                    recorded[s_class]:
+                                continue
+                            self.backend.save_all(s_class, objs)
+                    self.flushes += 1
+                    self._mark_written(s_class, recorded[s_class])
+            except BaseException as e:
+                with self._cond:
+                    for s_class, objs in dirty.items():
+                        if self._written.get(s_class, 0) < recorded[s_class]:
+                            self._dirty.setdefault(s_class, objs)
+                    self._error = e
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._error = None
+
+    def close(self):
+        """ Stop the flusher and write the pending mutations
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _flush_class(self, s_class: str):
+        """ Write the pending mutations of one class, including the ones
+        the flusher has taken but not written yet, since it waits for the
+        lock of the class held by the caller
+        """
+        with self._cond:
+            self._dirty.pop(s_class, None)
+            recorded = self._recorded.get(s_class, 0)
+            if self._written.get(s_class, 0) >= recorded:
+                return
+            objs = self._objs[s_class]
+        try:
+            self.backend.save_all(s_class, objs)
+        except BaseException:
+            with self._cond:
+                self._dirty.setdefault(s_class, objs)
+            raise
+        self.flushes += 1
+        self._mark_written(s_class, recorded)
+
+    def _record(self, s_class: str, objs: dict):
+        """ Mark a class dirty, waking the flusher when enough
+        mutations are pending
+        """
+        with self._cond:
+            self._dirty[s_class] = objs
+            self._objs[s_class] = objs
+            self._recorded[s_class] = self._recorded.get(s_class, 0) + 1
+            self._pending += 1
+            if self._flusher is None and not self._closed:
+                self._flusher = threading.Thread(target=self._run,
+                                                 daemon=True)
+                self._flusher.start()
+            if self._pending >= self.max_pending:
+                self._cond.notify_all()
+        if self._closed:
+            # Saved after shutdown: written through, the caller holds
+            # the lock of the class
+            self.save_all(s_class, objs)
+
+    def _mark_written(self, s_class: str, recorded: int):
+        """ Record that the first `recorded` mutations of a class are
+        written, waking the writers waiting for them
+        """
+        with self._cond:
+            if self._written.get(s_class, 0) < recorded:
+                self._written[s_class] = recorded
+            self._cond.notify_all()
+
+    def _run(self):
+        """ Flusher loop
+        """
+        while True:
+            with self._cond:
+                # The interval only bounds how long mutations wait for a
+                # write when no committer is waiting for them
+                self._cond.wait_for(
+                    lambda: self._closed or
+                    self._pending >= self.max_pending or
+                    (self._waiting > 0 and len(self._dirty) > 0),
+                    self.interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Kept dirty, retried on the next round
+                pass
+
+
+def lazy_load_from_env() -> bool:
+    """ Whether objects are loaded on first access (STORAGE_LAZY_LOAD)
+    """
+    return getenv("STORAGE_LAZY_LOAD", "0") == "1"
+
+
+def storage_from_env(lock_for: Callable = None) -> FileStorage:
+    """ Build the storage backend selected by STORAGE_TYPE, coalescing
+    writes when STORAGE_FLUSH_INTERVAL is set; `lock_for(s_class)`
+    returns the lock held while a class is written
+    """
+    if getenv("STORAGE_TYPE") == "journal":
+        try:
+            compact_every = int(getenv("STORAGE_COMPACT_EVERY", 1000))
+        except ValueError:
+            compact_every = 1000
+        fsync = getenv("STORAGE_FSYNC", "0") == "1"
+        storage = JournalStorage(compact_every, fsync)
+    else:
+        storage = FileStorage()
+
+    try:
+        interval = float(getenv("STORAGE_FLUSH_INTERVAL", 0))
+        max_pending = int(getenv("STORAGE_FLUSH_MAX_PENDING", 100))
+    except ValueError:
+        interval, max_pending = 0, 100
+    if interval <= 0:
+        return storage
+    # STORAGE_DURABILITY: "async" acknowledges saves before writing them,
+    # "group" makes them wait for the next write
+    storage = GroupCommitStorage(
+        storage, interval, max_pending,
+        wait=getenv("STORAGE_DURABILITY", "async") == "group",
+        lock_for=lock_for)
+    atexit.register(storage.close)
+    return storage
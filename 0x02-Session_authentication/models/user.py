@@ -1,14 +1,79 @@
 #!/usr/bin/env python3
 """ User module
 """
+from os import getenv
 import hashlib
-from models.base import Base
+import hmac
+import os
+from models.base import Base, COMPACT
+
+
+# Scheme used for new password hashes: "sha256" (legacy unsalted digest)
+# or "pbkdf2_sha256" (salted, USER_PASSWORD_ITERATIONS rounds)
+PASSWORD_SCHEME = getenv("USER_PASSWORD_SCHEME", "sha256")
+try:
+    PASSWORD_ITERATIONS = int(getenv("USER_PASSWORD_ITERATIONS", 100000))
+except ValueError:
+    PASSWORD_ITERATIONS = 100000
+PBKDF2_PREFIX = "$pbkdf2-sha256$"
+
+
+def hash_password(pwd: str, scheme: str = None,
+                  iterations: int = None) -> str:
+    """ Hash a password with a scheme, the configured one by default
+    """
+    scheme = scheme or PASSWORD_SCHEME
+    if scheme == "pbkdf2_sha256":
+        iterations = iterations or PASSWORD_ITERATIONS
+        salt = os.urandom(16)
+        digest = hashlib.pbkdf2_hmac("sha256", pwd.encode(), salt,
+                                     iterations)
+        return "{}{}${}${}".format(PBKDF2_PREFIX, iterations,
+                                   salt.hex(), digest.hex())
+    return hashlib.sha256(pwd.encode()).hexdigest().lower()
+
+
+def verify_password(pwd: str, hashed: str) -> bool:
+    """ Check a password against a hash of any supported scheme
+    """
+    if hashed.startswith(PBKDF2_PREFIX):
+        try:
+            iterations, salt, digest = hashed[len(PBKDF2_PREFIX):].split("$")
+            candidate = hashlib.pbkdf2_hmac("sha256", pwd.encode(),
+                                            bytes.fromhex(salt),
+                                            int(iterations))
+        except ValueError:
+            # Malformed hash
+            return False
+        return hmac.compare_digest(candidate.hex(), digest)
+    candidate = hashlib.sha256(pwd.encode()).hexdigest().lower()
+    return hmac.compare_digest(candidate, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """ Whether a hash is weaker than the configured scheme and cost;
+    a hash is never rewritten with a weaker one
+    """
+    if hashed.startswith(PBKDF2_PREFIX):
+        if PASSWORD_SCHEME != "pbkdf2_sha256":
+            return False
+        try:
+            iterations = int(hashed[len(PBKDF2_PREFIX):].split("$")[0])
+        except ValueError:
+            return False
+        return iterations < PASSWORD_ITERATIONS
+    return PASSWORD_SCHEME != "sha256"
 
 
 class User(Base):
     """ User class
     """
 
+    indexed_attributes = ("email",)
+
+    if COMPACT:
+        __slots__ = ("email", "_password", "first_name", "last_name")
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -26,22 +91,28 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hash it with PASSWORD_SCHEME
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = hash_password(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
-        """ Validate a password
+        """ Validate a password, upgrading a stored hash made with an
+        older scheme or cost
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        if not verify_password(pwd, self.password):
+            return False
+        if needs_rehash(self.password):
+            self.password = pwd
+            if self.__class__.get(self.id) is self:
+                self.save()
+        return True
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ UserSession module that defines a class for user session management.
 """
-from models.base import Base
+from models.base import Base, COMPACT, intern_str
 
 
 class UserSession(Base):
@@ -10,6 +10,11 @@ class UserSession(Base):
     It contains attributes such as user_id and session_id.
     """
 
+    indexed_attributes = ("session_id", "user_id")
+
+    if COMPACT:
+        __slots__ = ("user_id", "session_id")
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Initializes a UserSession instance with user_id and session_id.
@@ -19,5 +24,5 @@ class UserSession(Base):
             **kwargs: Dictionary of keyword.
         """
         super().__init__(*args, **kwargs)
-        self.user_id = kwargs.get('user_id')  # User ID
+        self.user_id = intern_str(kwargs.get('user_id'))  # User ID
         self.session_id = kwargs.get('session_id')  # Unique session
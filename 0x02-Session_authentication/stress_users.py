@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test of the object store through /api/v1/users:
+threads create, delete, fetch and list users in parallel, then the
+store is reloaded from disk and compared to memory.
+
+Each storage configuration runs in its own process and directory:
+
+    ./stress_users.py [threads] [requests per thread]
+"""
+import base64
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+CONFIGURATIONS = (
+    {},
+    {"STORAGE_LAZY_LOAD": "1"},
+    {"STORAGE_TYPE": "journal"},
+    {"STORAGE_TYPE": "journal", "STORAGE_LAZY_LOAD": "1"},
+    {"STORAGE_LAZY_LOAD": "1", "STORAGE_FLUSH_INTERVAL": "0.01"},
+    {"MODELS_COMPACT": "1", "STORAGE_LAZY_LOAD": "1"},
+)
+PRELOADED_USERS = 3000
+
+
+def preload(count: int) -> None:
+    """ Write `count` users to disk, so that a lazy store starts with
+    only locators
+    """
+    from models.user import User
+    from models.base import DATA
+
+    User.load_from_file()
+    for i in range(count):
+        user = User()
+        user.email = "preloaded{}@stress".format(i)
+        user.password = "pwd"
+        DATA["User"][user.id] = user
+    User.save_to_file()
+
+
+def race_reads(removals: int = 80) -> list:
+    """ Fetch every user while another thread removes some, each removal
+    rewriting the snapshot that lazy locators point to
+    """
+    from models.base import DATA
+    from models.user import User
+
+    user_ids = list(DATA["User"])
+    removed = set(random.sample(user_ids, removals))
+    errors = []
+
+    def remover():
+        for user_id in removed:
+            User.get(user_id).remove()
+
+    thread = threading.Thread(target=remover)
+    thread.start()
+    while thread.is_alive():
+        for user_id in user_ids:
+            try:
+                user = User.get(user_id)
+                if user is not None and user.id != user_id:
+                    errors.append("{} returned for {}".format(
+                        user.id, user_id))
+            except Exception as e:
+                errors.append(repr(e))
+    thread.join()
+    return errors
+
+
+def hammer(threads: int, requests: int) -> list:
+    """ Run the parallel requests, returning the errors found
+    """
+    from api.v1.app import app
+    from models.base import DATA
+    from models.user import User
+
+    admin = User()
+    admin.email = "admin@stress"
+    admin.password = "pwd"
+    admin.save()
+    credentials = base64.b64encode(b"admin@stress:pwd").decode()
+    headers = {"Authorization": "Basic " + credentials}
+    preloaded = [user_id for user_id in list(DATA["User"])
+                 if user_id != admin.id]
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        created = []
+        for _ in range(requests):
+            try:
+                op = random.random()
+                if op < 0.25:
+                    r = client.post("/api/v1/users", headers=headers, json={
+                        "email": "{}@stress".format(random.random()),
+                        "password": "pwd"})
+                    assert r.status_code == 201, r.data
+                    created.append(r.json["id"])
+                elif op < 0.4:
+                    # Removals rewrite the snapshot under lazy readers
+                    user_id = (created.pop() if created and op < 0.3
+                               else random.choice(preloaded))
+                    r = client.delete("/api/v1/users/" + user_id,
+                                      headers=headers)
+                    assert r.status_code in (200, 404), r.data
+                elif op < 0.8:
+                    user_id = random.choice(preloaded)
+                    r = client.get("/api/v1/users/" + user_id,
+                                   headers=headers)
+                    assert r.status_code in (200, 404), r.data
+                    if r.status_code == 200:
+                        assert r.json["id"] == user_id, \
+                            "{} returned for {}".format(r.json["id"],
+                                                        user_id)
+                else:
+                    query = random.choice(["?limit=50", "?stream=1", ""])
+                    r = client.get("/api/v1/users" + query,
+                                   headers=headers)
+                    assert r.status_code == 200, r.data
+                    r.get_data()
+            except Exception as e:
+                errors.append(repr(e))
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return errors
+
+
+def check_reload() -> list:
+    """ Compare the objects in memory to the ones reloaded from disk
+    """
+    from models.base import Base, DATA
+    from models.user import User
+
+    Base.flush()
+    before = {user_id: User.get(user_id).to_json(True)
+              for user_id in list(DATA["User"])}
+    User.load_from_file()
+    after = {user_id: User.get(user_id).to_json(True)
+             for user_id in list(DATA["User"])}
+    errors = []
+    if before != after:
+        errors.append("reload differs: {} objects in memory, {} on disk"
+                      .format(len(before), len(after)))
+    for user_id, user_json in after.items():
+        if user_json["id"] != user_id:
+            errors.append("{} stored under {}".format(user_json["id"],
+                                                      user_id))
+    return errors
+
+
+def run(threads: int, requests: int) -> int:
+    """ Stress the store configured by the environment
+    """
+    preload(PRELOADED_USERS)
+    # Forget the loaded objects: a lazy store only keeps locators
+    from models.user import User
+    User.load_from_file()
+
+    start = time.time()
+    errors = race_reads()
+    errors += hammer(threads, requests)
+    errors += check_reload()
+    print("{:.2f}s, {} errors".format(time.time() - start, len(errors)))
+    for error in errors[:5]:
+        print("   ", error)
+    return 1 if errors else 0
+
+
+def main() -> None:
+    """ Run every configuration in a fresh process and directory
+    """
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    if os.getenv("STRESS_RUN") == "1":
+        sys.exit(run(threads, requests))
+
+    project = os.path.dirname(os.path.abspath(__file__))
+    failed = 0
+    for configuration in CONFIGURATIONS:
+        env = dict(os.environ, STRESS_RUN="1", AUTH_TYPE="basic_auth",
+                   BASIC_AUTH_CACHE_SIZE="0", PYTHONPATH=project,
+                   **configuration)
+        print(configuration or "defaults", end=": ", flush=True)
+        with tempfile.TemporaryDirectory() as directory:
+            failed += subprocess.run(
+                [sys.executable, os.path.abspath(__file__),
+                 str(threads), str(requests)],
+                cwd=directory, env=env).returncode != 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,12 @@ AUTH = Auth()
 app = Flask(__name__)
 
 
+@app.teardown_appcontext
+def remove_db_session(exception=None) -> None:
+    """Release the database session at the end of each request."""
+    AUTH.remove_db_session()
+
+
 @app.route("/", methods=["GET"], strict_slashes=False)
 def home_page() -> str:
     """Handle GET requests to the root endpoint.
@@ -51,7 +57,15 @@ def login_user() -> str:
     """
     email, password = request.form.get("email"), request.form.get("password")
 
-    if not AUTH.valid_login(email, password):
+    if AUTH.offload_login:
+        try:
+            valid = AUTH.submit_valid_login(email, password).result()
+        except TimeoutError:
+            # Too many logins waiting for a bcrypt worker
+            abort(503)
+    else:
+        valid = AUTH.valid_login(email, password)
+    if not valid:
         # Invalid credentials, return unauthorized error
         abort(401)
 
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 """Authentication module to manage user registration."""
 
+import asyncio
 import logging
-from typing import Union
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Tuple, Union
 from uuid import uuid4
 import bcrypt
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 from db import DB
 from user import User
@@ -13,7 +20,8 @@ logging.disable(logging.WARNING)
 
 
 def _hash_password(password: str) -> bytes:
-    """Hashes a password using bcrypt.
+    """Hashes a password using bcrypt, with the work factor set by
+    BCRYPT_ROUNDS (12 by default).
 
     Args:
         password (str): The plain text password.
@@ -21,7 +29,8 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: The hashed password.
     """
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    rounds = int(os.environ.get("BCRYPT_ROUNDS", 12))
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
 
 
 def _generate_uuid() -> str:
@@ -33,11 +42,89 @@ def _generate_uuid() -> str:
     return str(uuid4())
 
 
+class LoginExecutor:
+    """Bounded thread pool running login checks off the request thread,
+    with queueing metrics. At most `queue_size` checks wait or run at once;
+    submitting more waits up to `timeout` seconds for room.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(workers,
+                                            thread_name_prefix="login")
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def submit(self, fn, *args) -> Future:
+        """Queues fn(*args), raising TimeoutError if the queue stays full.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            raise TimeoutError("Login queue is full")
+        with self._lock:
+            self.submitted += 1
+        try:
+            return self._executor.submit(self._run, time.perf_counter(),
+                                         fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def stats(self) -> dict:
+        """Returns the queueing and latency counters."""
+        with self._lock:
+            completed = max(self.completed, 1)
+            return {
+                "workers": self.workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "in_flight": self.submitted - self.completed,
+                "avg_wait": self.total_wait / completed,
+                "max_wait": self.max_wait,
+                "avg_run": self.total_run / completed,
+            }
+
+    def shutdown(self) -> None:
+        """Waits for the queued checks and stops the pool."""
+        self._executor.shutdown(wait=True)
+
+    def _run(self, queued_at: float, fn, *args):
+        """Runs a queued check and records its wait and run times."""
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            self._slots.release()
+            with self._lock:
+                self.completed += 1
+                self.total_wait += started - queued_at
+                self.max_wait = max(self.max_wait, started - queued_at)
+                self.total_run += finished - started
+
+
 class Auth:
     """Handles user authentication operations: registration."""
 
     def __init__(self):
         self._db = DB()
+        # Login checks run in a pool when LOGIN_WORKERS is set
+        self.offload_login = bool(os.environ.get("LOGIN_WORKERS"))
+        self._login_executor = None
+        self._login_executor_lock = threading.Lock()
+
+    def remove_db_session(self) -> None:
+        """Releases the database session of the current request."""
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """Registers a new user with an email and password.
@@ -59,7 +146,87 @@ class Auth:
             pass
 
         hashed_password = _hash_password(password)
-        return self._db.add_user(email, hashed_password)
+        try:
+            return self._db.add_user(email, hashed_password)
+        except IntegrityError:
+            # Registered concurrently since the lookup above
+            raise ValueError(f"User with email {email} already exists")
+
+    def register_users(self, credentials: Iterable[Tuple[str, str]],
+                       workers: int = None,
+                       batch_size: int = 1000) -> dict:
+        """Registers users in bulk: each batch is deduplicated with one
+        query, hashed in parallel worker processes and inserted in one
+        transaction. Emails already registered, or repeated in the input,
+        are skipped.
+
+        Args:
+            credentials (iterable): (email, plain text password) pairs.
+            workers (int): Number of hashing processes, the CPU count by
+                default.
+            batch_size (int): Number of users per batch.
+
+        Returns:
+            dict: The created and skipped counts, and the time spent and
+                users per second of each phase.
+        """
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, batch_size // (4 * workers))
+        stats = {"created": 0, "skipped": 0}
+        timings = {"dedupe": 0.0, "hash": 0.0, "insert": 0.0}
+        counts = {"dedupe": 0, "hash": 0, "insert": 0}
+        seen = set()
+        credentials = iter(credentials)
+        with ProcessPoolExecutor(workers) as executor:
+            while True:
+                batch = list(islice(credentials, batch_size))
+                if not batch:
+                    break
+
+                start = time.perf_counter()
+                unique = {}
+                for email, password in batch:
+                    if email not in seen and email not in unique:
+                        unique[email] = password
+                existing = self._db.find_existing_emails(unique)
+                new = [(email, password) for email, password
+                       in unique.items() if email not in existing]
+                seen.update(unique)
+                stats["skipped"] += len(batch) - len(new)
+                timings["dedupe"] += time.perf_counter() - start
+                counts["dedupe"] += len(batch)
+
+                start = time.perf_counter()
+                hashes = executor.map(_hash_password,
+                                      [password for _, password in new],
+                                      chunksize=chunksize)
+                users = [(email, hashed_password) for (email, _),
+                         hashed_password in zip(new, hashes)]
+                timings["hash"] += time.perf_counter() - start
+                counts["hash"] += len(users)
+
+                start = time.perf_counter()
+                try:
+                    stats["created"] += self._db.add_users(users)
+                except IntegrityError:
+                    # Some were registered concurrently since the lookup
+                    existing = self._db.find_existing_emails(
+                        email for email, _ in users)
+                    users = [user for user in users
+                             if user[0] not in existing]
+                    stats["skipped"] += len(existing)
+                    stats["created"] += self._db.add_users(users)
+                timings["insert"] += time.perf_counter() - start
+                counts["insert"] += len(users)
+
+        for phase, seconds in timings.items():
+            stats[phase] = {
+                "users": counts[phase],
+                "seconds": round(seconds, 3),
+                "per_second": round(counts[phase] / seconds, 1)
+                if seconds else None,
+            }
+        return stats
 
     def valid_login(self, email: str, password: str) -> bool:
         """Validates a user's login credentials.
@@ -81,6 +248,61 @@ class Auth:
 
         return False
 
+    def submit_valid_login(self, email: str, password: str) -> Future:
+        """Validates a user's login credentials in the login pool, sized by
+        LOGIN_WORKERS (CPU count by default), LOGIN_QUEUE_SIZE and
+        LOGIN_QUEUE_TIMEOUT.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's plain text password.
+
+        Returns:
+            Future: Resolves to the result of valid_login.
+
+        Raises:
+            TimeoutError: If the login queue stays full.
+        """
+        return self._login_pool().submit(self._pooled_valid_login,
+                                         email, password)
+
+    async def valid_login_async(self, email: str, password: str) -> bool:
+        """Validates a user's login credentials without blocking the
+        event loop.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's plain text password.
+
+        Returns:
+            bool: True if the credentials are valid, False otherwise.
+        """
+        return await asyncio.wrap_future(
+            self.submit_valid_login(email, password))
+
+    def login_stats(self) -> dict:
+        """Returns the queueing metrics of the login pool."""
+        return self._login_pool().stats()
+
+    def _login_pool(self) -> LoginExecutor:
+        """Returns the login pool, creating it on first use."""
+        with self._login_executor_lock:
+            if self._login_executor is None:
+                workers = int(os.environ.get("LOGIN_WORKERS") or
+                              os.cpu_count() or 1)
+                self._login_executor = LoginExecutor(
+                    workers,
+                    int(os.environ.get("LOGIN_QUEUE_SIZE", 64 * workers)),
+                    float(os.environ.get("LOGIN_QUEUE_TIMEOUT", 5)))
+            return self._login_executor
+
+    def _pooled_valid_login(self, email: str, password: str) -> bool:
+        """valid_login releasing the pool thread's database session."""
+        try:
+            return self.valid_login(email, password)
+        finally:
+            self._db.remove_session()
+
     def create_session(self, email: str) -> str:
         """Creates a new session for the user and returns a session ID.
 
@@ -90,13 +312,10 @@ class Auth:
         Returns:
             str: The new session ID or None if user not found.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            return None
-
         session_id = _generate_uuid()
-        self._db.update_user(user.id, session_id=session_id)
+        if not self._db.update_users_by({"email": email},
+                                        session_id=session_id):
+            return None
         return session_id
 
     def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
@@ -137,13 +356,10 @@ class Auth:
         Returns:
             str: The reset token.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            raise ValueError("User with this email does not exist")
-
         reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
+        if not self._db.update_users_by({"email": email},
+                                        reset_token=reset_token):
+            raise ValueError("User with this email does not exist")
         return reset_token
 
     def update_password(self, reset_token: str, new_password: str) -> None:
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Load benchmark of POST /sessions: concurrent clients log in through
+the Flask app, inline on the request thread and through the login pool
+at several sizes, each in a fresh process and directory:
+
+    ./bench_login_pool.py [pool sizes ...]
+
+BENCH_CLIENTS (16), BENCH_LOGINS (64) and BCRYPT_ROUNDS (10) set the
+load.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def run() -> dict:
+    """Logs in concurrently with the configuration of the environment.
+
+    Returns:
+        dict: The logins per second and, with a pool, its metrics.
+    """
+    from app import AUTH, app
+
+    clients = int(os.environ.get("BENCH_CLIENTS", 16))
+    logins = int(os.environ.get("BENCH_LOGINS", 64))
+    AUTH.register_user("bob@bench.com", "pwd")
+    credentials = {"email": "bob@bench.com", "password": "pwd"}
+    remaining = [logins]
+    lock = threading.Lock()
+    errors = []
+
+    def client():
+        test_client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            response = test_client.post("/sessions", data=credentials)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    result = {"logins_per_sec": logins / elapsed, "errors": len(errors)}
+    if AUTH.offload_login:
+        result.update(AUTH.login_stats())
+    return result
+
+
+def main() -> None:
+    """Runs the inline configuration and each pool size."""
+    if os.environ.get("BENCH_RUN") == "1":
+        print(json.dumps(run()))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8]
+    project = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, BENCH_RUN="1", PYTHONPATH=project)
+    env.setdefault("BCRYPT_ROUNDS", "10")
+    env.pop("LOGIN_WORKERS", None)
+    print("{} CPUs, BCRYPT_ROUNDS={}".format(
+        os.cpu_count(), env["BCRYPT_ROUNDS"]))
+    print("{:<8} {:>10} {:>7} {:>10} {:>10}".format(
+        "workers", "logins/s", "errors", "avg wait", "max wait"))
+    for size in [None] + sizes:
+        if size is not None:
+            env["LOGIN_WORKERS"] = str(size)
+        with tempfile.TemporaryDirectory() as directory:
+            result = json.loads(subprocess.run(
+                [sys.executable, os.path.abspath(__file__)],
+                cwd=directory, env=env, check=True,
+                stdout=subprocess.PIPE).stdout)
+        waits = ""
+        if size is not None:
+            waits = "{:>9.0f}ms {:>9.0f}ms".format(
+                result["avg_wait"] * 1e3, result["max_wait"] * 1e3)
+        print("{:<8} {:>10.1f} {:>7} {}".format(
+            "inline" if size is None else size,
+            result["logins_per_sec"], result["errors"], waits).rstrip())
+
+
+if __name__ == "__main__":
+    main()
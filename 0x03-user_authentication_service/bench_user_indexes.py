@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark of user lookups by email, session_id and reset_token on a
+users table created by the previous schema, without indexes, then after
+DB has migrated it. Runs on a temporary SQLite file:
+
+    ./bench_user_indexes.py [rows] [lookups]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import DB
+from user import User
+
+
+def create_legacy_table(path: str, rows: int) -> None:
+    """Creates the users table of the previous schema and fills it.
+
+    Args:
+        path (str): The SQLite database file.
+        rows (int): The number of users, every other one logged in and
+            every tenth one resetting their password.
+    """
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE users (id INTEGER NOT NULL, "
+               "email VARCHAR(250) NOT NULL, "
+               "hashed_password VARCHAR(250) NOT NULL, "
+               "session_id VARCHAR(250), reset_token VARCHAR(250), "
+               "PRIMARY KEY (id))")
+    db.executemany(
+        "INSERT INTO users (email, hashed_password, session_id, reset_token)"
+        " VALUES (?, ?, ?, ?)",
+        (("user{}@bench.com".format(i), "$2b$12$" + "x" * 53,
+          "session-{}".format(i) if i % 2 == 0 else None,
+          "reset-{}".format(i) if i % 10 == 0 else None)
+         for i in range(rows)))
+    db.commit()
+    db.close()
+
+
+def time_lookups(url: str, filters: list) -> float:
+    """Times the query of DB.find_user_by for each filter.
+
+    Returns:
+        float: The average milliseconds per lookup.
+    """
+    session = sessionmaker(bind=create_engine(url))()
+    start = time.perf_counter()
+    for kwargs in filters:
+        assert session.query(User).filter_by(**kwargs).first() is not None
+    elapsed = time.perf_counter() - start
+    session.close()
+    return elapsed / len(filters) * 1e3
+
+
+def main() -> None:
+    """Creates the table and times lookups before and after migration."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    path = os.path.join(tempfile.mkdtemp(), "a.db")
+    url = "sqlite:///" + path
+
+    start = time.perf_counter()
+    create_legacy_table(path, rows)
+    print("{} users created in {:.1f}s".format(
+        rows, time.perf_counter() - start))
+
+    sample = [random.randrange(0, rows, 10) for _ in range(lookups)]
+    columns = (
+        ("email", ["user{}@bench.com".format(i) for i in sample]),
+        ("session_id", ["session-{}".format(i) for i in sample]),
+        ("reset_token", ["reset-{}".format(i) for i in sample]),
+    )
+    before = {column: time_lookups(url, [{column: value}
+                                         for value in values])
+              for column, values in columns}
+
+    start = time.perf_counter()
+    DB(url, persistent=True).remove_session()
+    migration = time.perf_counter() - start
+
+    after = {column: time_lookups(url, [{column: value}
+                                        for value in values])
+             for column, values in columns}
+
+    print("migration to indexed columns: {:.1f}s".format(migration))
+    print("{:<12} {:>12} {:>12}".format("lookup by", "before", "after"))
+    for column, _ in columns:
+        print("{:<12} {:>10.2f}ms {:>10.3f}ms".format(
+            column, before[column], after[column]))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,117 @@
 """
 Database module for managing user records.
 """
-from sqlalchemy import create_engine, tuple_
-from sqlalchemy.exc import InvalidRequestError
-from sqlalchemy.orm import sessionmaker, Session
+import os
+from typing import Iterable, List, Set, Tuple
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.exc import InvalidRequestError, OperationalError
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.pool import QueuePool
 from user import Base, User
 
 
+def _engine_options(url: str) -> dict:
+    """Builds create_engine options from the DB_POOL_* environment variables.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        dict: Keyword arguments for create_engine.
+    """
+    options = {"echo": False}
+    if url.startswith("sqlite"):
+        # Connections are shared by the threads of the WSGI server
+        options["connect_args"] = {"check_same_thread": False}
+    if os.environ.get("DB_POOL_SIZE"):
+        options["poolclass"] = QueuePool
+        options["pool_size"] = int(os.environ["DB_POOL_SIZE"])
+        options["max_overflow"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+        options["pool_timeout"] = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    if os.environ.get("DB_POOL_RECYCLE"):
+        options["pool_recycle"] = int(os.environ["DB_POOL_RECYCLE"])
+    return options
+
+
+def _enable_wal(dbapi_connection, connection_record) -> None:
+    """Switches SQLite connections to write-ahead logging, so that readers
+    don't block on a writer.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 class DB:
     """DB class
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None, persistent: bool = None) -> None:
         """Initialize a new DB instance
+
+        Args:
+            url (str): Database URL, DB_URL or sqlite:///a.db by default.
+                For tests, a shared in-memory SQLite database can be used:
+                sqlite:///file:name?mode=memory&cache=shared&uri=true
+            persistent (bool): Keep existing data and only create missing
+                tables and indexes, DB_PERSISTENT=1 by default. Otherwise
+                the database is wiped on startup.
+        """
+        if url is None:
+            url = os.environ.get("DB_URL", "sqlite:///a.db")
+        if persistent is None:
+            persistent = os.environ.get("DB_PERSISTENT", "0") == "1"
+        self._engine = create_engine(url, **_engine_options(url))
+        if url.startswith("sqlite") and \
+                os.environ.get("DB_SQLITE_WAL", "1") == "1":
+            event.listen(self._engine, "connect", _enable_wal)
+        self._keepalive = None
+        if "mode=memory" in url:
+            # A shared in-memory database lives as long as a connection
+            self._keepalive = self._engine.connect()
+        if not persistent:
+            Base.metadata.drop_all(self._engine)
+        self._create_schema()
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+
+    def _create_schema(self) -> None:
+        """Creates the missing tables and indexes. Other worker processes may
+        be creating them at the same time, so that race is tolerated.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        try:
+            Base.metadata.create_all(self._engine)
+            self._create_missing_indexes()
+        except OperationalError as e:
+            if "already exists" not in str(e):
+                raise
+            self._create_missing_indexes()
+
+    def _create_missing_indexes(self) -> None:
+        """Creates the indexes declared on User but missing from an existing
+        users table (create_all skips tables that already exist).
+
+        Raises:
+            IntegrityError: If existing rows violate a unique index, such
+                as duplicated emails, which must be merged first.
+        """
+        existing = {index["name"] for index
+                    in inspect(self._engine).get_indexes(User.__tablename__)}
+        for index in User.__table__.indexes:
+            if index.name not in existing:
+                index.create(bind=self._engine)
 
     @property
     def _session(self) -> Session:
-        """Memoized session object
+        """Session of the current thread or request
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Closes the session of the current thread or request
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -51,6 +135,54 @@ class DB:
             session.rollback()
             raise  # Allow exceptions to propagate for better error handling
 
+    def add_users(self, users: List[Tuple[str, str]]) -> int:
+        """
+        Adds users in a single transaction, with one executemany INSERT.
+
+        Args:
+            users (list): (email, hashed password) pairs.
+
+        Returns:
+            int: The number of inserted users.
+
+        Raises:
+            IntegrityError: If an email is already registered; nothing
+                is inserted then.
+        """
+        if not users:
+            return 0
+        session = self._session
+        try:
+            session.execute(User.__table__.insert(), [
+                {"email": email, "hashed_password": hashed_password}
+                for email, hashed_password in users])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return len(users)
+
+    def find_existing_emails(self, emails: Iterable[str],
+                             chunk_size: int = 500) -> Set[str]:
+        """
+        Finds which of the given emails are already registered, with one
+        query per `chunk_size` emails (SQLite caps bound parameters).
+
+        Args:
+            emails (iterable): The emails to look up.
+
+        Returns:
+            set: The registered emails.
+        """
+        emails = list(emails)
+        existing = set()
+        for start in range(0, len(emails), chunk_size):
+            chunk = emails[start:start + chunk_size]
+            rows = self._session.query(User.email).filter(
+                User.email.in_(chunk)).all()
+            existing.update(email for email, in rows)
+        return existing
+
     def find_user_by(self, **filters) -> User:
         """
         Finds a user in the database using provided attributes.
@@ -66,23 +198,17 @@ class DB:
             NoResultFound: If no user matches the provided filters.
         """
         session = self._session
-        attributes, values = [], []
+        self._check_filters(filters)
 
-        # Validate and prepare filters
-        for attribute, value in filters.items():
-            if not hasattr(User, attribute):
-                raise InvalidRequestError(f"Invalid attribute: {attribute}")
-            attributes.append(getattr(User, attribute))
-            values.append(value)
-
-        # Execute the query
-        query = session.query(User)
-        user = query.filter(tuple_(*attributes).in_([tuple(values)])).first()
+        # A None value never matches, like NULL = NULL in SQL
+        user = None
+        if None not in filters.values():
+            user = session.query(User).filter_by(**filters).first()
         if not user:
             raise NoResultFound("No user found matching the given criteria.")
         return user
 
-    def update_user(self, user_id: int, **updates) -> None:
+    def update_user(self, user_id: int, **updates) -> int:
         """
         Updates attributes of an existing user in the database.
 
@@ -90,16 +216,55 @@ class DB:
             user_id (int): The ID of the user to update.
             **updates: Keyword arguments for the attributes to update.
 
+        Returns:
+            int: The number of updated rows (0 if the user doesn't exist).
+
         Raises:
             ValueError: If any update attribute is invalid.
         """
-        session = self._session
-        user = self.find_user_by(id=user_id)
+        return self.update_users_by({"id": user_id}, **updates)
+
+    def update_users_by(self, filters: dict, **updates) -> int:
+        """
+        Updates the users matching filters with a single UPDATE statement,
+        without loading them.
+
+        Args:
+            filters (dict): The user attributes to match.
+            **updates: Keyword arguments for the attributes to update.
+
+        Returns:
+            int: The number of updated rows.
 
-        # Update attributes
-        for attribute, value in updates.items():
+        Raises:
+            InvalidRequestError: If any filter attribute is invalid.
+            ValueError: If any update attribute is invalid.
+        """
+        self._check_filters(filters)
+        for attribute in updates:
             if not hasattr(User, attribute):
                 raise ValueError(f"Invalid attribute: {attribute}")
-            setattr(user, attribute, value)
+        if None in filters.values() or not updates:
+            return 0
 
-        session.commit()
+        session = self._session
+        try:
+            count = session.query(User).filter_by(**filters).update(
+                updates, synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return count
+
+    @staticmethod
+    def _check_filters(filters: dict) -> None:
+        """
+        Validates the attributes used to match users.
+
+        Raises:
+            InvalidRequestError: If any filter attribute is invalid.
+        """
+        for attribute in filters:
+            if not hasattr(User, attribute):
+                raise InvalidRequestError(f"Invalid attribute: {attribute}")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Command line entry point to register users in bulk from a CSV file.
+
+The CSV file has a header row with `email` and `password` columns:
+
+    ./import_users.py users.csv --workers 8 --batch-size 2000
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+
+def main() -> None:
+    """Parses the arguments and imports the users."""
+    parser = argparse.ArgumentParser(description="Register users in bulk.")
+    parser.add_argument("csv_file", help="CSV file with email and password "
+                        "columns, - for standard input")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="hashing processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="users per transaction (default: 1000)")
+    args = parser.parse_args()
+
+    # Import into the existing database instead of wiping it
+    os.environ.setdefault("DB_PERSISTENT", "1")
+    from auth import Auth
+
+    if args.csv_file == "-":
+        f = sys.stdin
+    else:
+        f = open(args.csv_file, newline="")
+    with f:
+        rows = csv.DictReader(f)
+        stats = Auth().register_users(
+            ((row["email"], row["password"]) for row in rows),
+            workers=args.workers, batch_size=args.batch_size)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, String
 # id, the integer primary key
-# email, a non-nullable string
+# email, a non-nullable unique string, indexed
 # hashed_password, a non-nullable string
-# session_id, a nullable string
-# reset_token, a nullable string
+# session_id, a nullable string, indexed
+# reset_token, a nullable string, indexed
 
 
 engine = create_engine('sqlite:///:memory:', echo=False)
@@ -22,7 +22,7 @@ class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250))
-    reset_token = Column(String(250))
+    session_id = Column(String(250), index=True)
+    reset_token = Column(String(250), index=True)